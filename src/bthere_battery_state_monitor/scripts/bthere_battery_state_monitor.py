@@ -1,7 +1,10 @@
 #!/usr/bin/env python
-from rospy import init_node, loginfo, logerr, get_param, Publisher, Rate, is_shutdown, ROSInterruptException, Duration, Time
+from rospy import init_node, loginfo, logerr, logwarn, get_param, Publisher, is_shutdown, ROSInterruptException, Duration, Time
 from sensor_msgs.msg import BatteryState
 from std_msgs.msg import Header
+from bthere_sensor_common.adaptive_rate import get_adaptive_rate
+from bthere_sensor_common.capabilities import get_capabilities, log_startup_time
+from bthere_sensor_common.shm_channel import SampleWriter, BATTERY_LAYOUT, SHM_DIR
 import os
 import sys
 
@@ -33,11 +36,6 @@ POWER_SUPPLY_TECHNOLOGY_NICD = 5
 POWER_SUPPLY_TECHNOLOGY_LIMN = 6
 
 
-def is_tool_present(name):
-    from distutils.spawn import find_executable
-    return find_executable(name) is not None
-
-
 def get_named_value(input, key):
     value = None
     key = key + ':'
@@ -165,14 +163,15 @@ def get_battery_duration(input):
     return duration
 
 
-def get_battery_info(test_input_file):
+def get_battery_info(test_input_file, upower_present):
+    # upower_present comes from the capability probe, so PATH isn't searched on every update
     battery_info = None
     if (test_input_file is not None and len(test_input_file) > 0):
         test_file = open(test_input_file, 'r')
         battery_info = test_file.read()
         # print(battery_info)
     else:
-        if (is_tool_present('upower')):
+        if (upower_present):
             battery_found = False
             # Get the battery uri
             cmd_output = os.popen('upower -e').read()
@@ -205,17 +204,34 @@ def battery_level_monitor():
     pub = Publisher('/bthere/battery_state', BatteryState, queue_size=10)
     loginfo('Outputting to /bthere/battery_state')
     test_input_file = get_param('~test_input_file', None)
-    update_period = get_param('~update_period', 10.0)
     quiet = get_param('~quiet', False)
+    # If set, every sample is also written to /dev/shm/<shm_name> for local processes, see
+    # bthere_sensor_common.shm_channel
+    shm_name = get_param('~shm_name', '')
+    shm_writer = None
+    if (len(shm_name) > 0):
+        try:
+            shm_writer = SampleWriter(shm_name, BATTERY_LAYOUT)
+            loginfo('Also writing to shared memory segment ' + shm_name)
+        except (IOError, OSError, ValueError) as error:
+            # e.g. the segment was left by a monitor running as another user. Publishing doesn't depend on it.
+            logerr('Unable to write to shared memory segment ' + os.path.join(SHM_DIR, shm_name) + ': ' + str(error) +
+                   '. Only publishing.')
     if (test_input_file is not None):
         loginfo('Using test data from %s' % test_input_file)
 
-    rate = Rate(1/float(update_period))
-    loginfo('Publishing rate: ' + str(1/float(update_period)) + 'hz')
+    upower_present = get_capabilities()['tools']['upower'] is not None
+    if (not upower_present and test_input_file is None):
+        logerr('upower is not installed, no battery data will be published.')
+
+    # With ~adaptive set, the period speeds up while the current changes by 0.2 A or more between updates
+    rate = get_adaptive_rate(10.0, 0.2, '/bthere/battery_state/update_period')
+    loginfo('Publishing rate: ' + str(1/rate.period) + 'hz')
 
+    has_published = False
     while not is_shutdown():
 
-        cmd_output = get_battery_info(test_input_file)
+        cmd_output = get_battery_info(test_input_file, upower_present)
         if (cmd_output is not None):
             battery_state = BatteryState()
             battery_state.voltage = get_battery_voltage(cmd_output)
@@ -223,6 +239,7 @@ def battery_level_monitor():
                 logerr('Can\'t read voltage! Invalid status.')
             else:
                 battery_state.current = get_battery_current(cmd_output)
+                rate.add_sample(battery_state.current)
                 battery_state.charge = get_battery_charge(cmd_output)
                 battery_state.capacity = get_battery_capacity(cmd_output)
                 battery_state.design_capacity = get_battery_design_capacity(
@@ -268,6 +285,15 @@ def battery_level_monitor():
                               battery_state.serial_number)
 
                 pub.publish(battery_state)
+                if (shm_writer is not None):
+                    shm_writer.write(battery_state.header.stamp.to_sec(), battery_state.voltage,
+                                     battery_state.current, battery_state.charge, battery_state.capacity,
+                                     battery_state.design_capacity, battery_state.percentage,
+                                     battery_state.power_supply_status, battery_state.power_supply_health,
+                                     battery_state.power_supply_technology, battery_state.present)
+                if (not has_published):
+                    log_startup_time(loginfo, logwarn)
+                    has_published = True
 
         else:
             gated_loginfo(quiet, '------ Battery State --------------')
@@ -283,8 +309,13 @@ def print_help():
     print("   __name:=NAME                 the name of the node")
     print(
         "   _quiet:={true|false}         suppresses printing of samples to std out. Default is false")
+    print("   _shm_name:=NAME              also write samples to shared memory /dev/shm/NAME. Default is off")
     print("   _test_input_file:=FILENAME   file to use for mock battery info")
     print("   _update_period:=DOUBLE       seconds between updates. Default is 10.0")
+    print("   _adaptive:={true|false}      adapt the update period to how volatile the data is. Default is false")
+    print("   _min_period:=DOUBLE          shortest adaptive update period. Default is update_period / 4")
+    print("   _max_period:=DOUBLE          longest adaptive update period. Default is update_period * 4")
+    print("   _volatility_scale:=DOUBLE    change between updates that counts as volatile. Default is 0.2 (A)")
 
 
 def check_for_help_request(argv):
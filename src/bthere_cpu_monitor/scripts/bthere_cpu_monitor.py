@@ -1,33 +1,26 @@
 #!/usr/bin/env python
 
-from rospy import init_node, loginfo, logerr, logwarn, ROSInterruptException, Publisher, Rate, is_shutdown, get_param, Time
+from rospy import init_node, loginfo, logerr, logwarn, ROSInterruptException, Publisher, is_shutdown, get_param, Time
 from bthere_sensor_msgs.msg import CPUData
 from std_msgs.msg import Header
-from os import listdir
-from platform import uname
+from bthere_sensor_common.adaptive_rate import get_adaptive_rate
+from bthere_sensor_common.capabilities import get_capabilities, log_startup_time
+from bthere_sensor_common.shm_channel import SampleWriter, CPU_LAYOUT, SHM_DIR
 from glob import glob
 from math import isnan
+import os
 
 
 SUPPORTED_ARCHITECTURES = ["x86_64", "aarch64"] # x86_64, 64 bit arm (raspberry pi)
 
 
-def get_hwmon_dir(architecture):
-    """Gets the path of the hwmon directory for the CPU, depending on architecture."""
-    hwmons = listdir("/sys/class/hwmon")
-    for hwmon in hwmons:
-            name_file = open("/sys/class/hwmon/" + hwmon + "/name")
-            name = name_file.read().strip()
-            if(name == "coretemp" or name == "cpu_thermal"): 
-                # The name file seems to always be "coretemp" on amd64 and cpu_thermal on a raspberry pi 3.
-                # This check might not be portable to all systems- more testing and/or research might be necessary.
-                name_file.close()
-                return "/sys/class/hwmon/" + hwmon
-            name_file.close()
-
-
-def get_cpu_temps(architecture):
+def get_cpu_temps(architecture, cpu_hwmon_path):
     """Gets the available current cpu temperature(s) depending on the system architecture.
+    parameters:
+        architecture: the system architecture, e.g. 'x86_64'.
+        cpu_hwmon_path: the hwmon directory for the CPU, as found by the capability probe. Looking it up once at
+        startup saves listing /sys/class/hwmon on every update.
+
     returns: a tuple of type (float, float[]) where the the first element is CPU package (overall) temperature 
         in degrees C, and the second element is a list of per-core CPU temperatures (also deg. C).
         Will return (NaN, []) if an error is encountered.
@@ -44,7 +37,6 @@ def get_cpu_temps(architecture):
     try:
         package_temp = None
         core_temps = []
-        cpu_hwmon_path = get_hwmon_dir(architecture)
         if(architecture == "x86_64"):
             labels = glob(cpu_hwmon_path + "/temp*_label")
             labels.sort()
@@ -148,7 +140,10 @@ def gated_loginfo(quiet, msg):
 def cpu_monitor():
     """Publishes CPU data to /bthere/cpu_data."""
 
-    architecture = uname()[4] # This will return 'x86_64', 'aarc64' (for 64 bit arm), etc.
+    # The capabilities are probed once per boot and cached, see bthere_sensor_common.capabilities.
+    capabilities = get_capabilities()
+    architecture = capabilities["architecture"] # This will be 'x86_64', 'aarc64' (for 64 bit arm), etc.
+    cpu_hwmon_path = capabilities["cpu_hwmon_dir"]
     if(not architecture in SUPPORTED_ARCHITECTURES):
         logerr("This architecture doesn't appear to be one that is supported. Consider adding it and openning" + 
                 " a pull request on github!")
@@ -161,26 +156,40 @@ def cpu_monitor():
     #update period should to be somewhat small since the cpu load data is average since you last checked,
     #a slower update rate will be less accurate for bursty loads and may introduce more lag than expected
     #if a load is added later in the time between updates for example.
-    update_period = get_param('~update_period', 1.0)
-    rate = Rate(1/float(update_period))
-    loginfo("Publishing rate: " + str(1.0/update_period) + " hz")
+    #with ~adaptive set, the period speeds up while the overall load is changing by 10% or more between updates.
+    rate = get_adaptive_rate(1.0, 0.1, "/bthere/cpu_data/update_period")
+    loginfo("Publishing rate: " + str(1.0/rate.period) + " hz")
 
     quiet = get_param("~quiet", False)
 
+    #if set, every sample is also written to /dev/shm/<shm_name> for local processes, see
+    #bthere_sensor_common.shm_channel.
+    shm_name = get_param("~shm_name", "")
+    shm_writer = None
+    if(len(shm_name) > 0):
+        try:
+            shm_writer = SampleWriter(shm_name, CPU_LAYOUT)
+            loginfo("Also writing to shared memory segment " + shm_name)
+        except (IOError, OSError, ValueError) as error:
+            # e.g. the segment was left by a monitor running as another user. Publishing doesn't depend on it.
+            logerr("Unable to write to shared memory segment " + os.path.join(SHM_DIR, shm_name) + ": " + str(error) +
+                   ". Only publishing.")
+
     #since the temperature-getting seems likely to be failure prone, try it once to check.
     able_to_get_temps = True
 
-    if(isnan(get_cpu_temps(architecture)[0])):
+    if(cpu_hwmon_path is None or isnan(get_cpu_temps(architecture, cpu_hwmon_path)[0])):
         logwarn("Unable to get CPU temperatures")
         able_to_get_temps = False
     
     last_cpu_times = []
+    has_published = False
     while not is_shutdown():
         data = CPUData()
         gated_loginfo(quiet, "------ CPU Data ------")
         if(able_to_get_temps):
             # If temperature data can be collected, add it to the CPUData to be published and log
-            package_temp, core_temps = get_cpu_temps(architecture)
+            package_temp, core_temps = get_cpu_temps(architecture, cpu_hwmon_path)
             gated_loginfo(quiet, "CPU Package temp. (C): " + str(package_temp))
             data.package_temp = package_temp
             if(len(core_temps) > 0):
@@ -199,10 +208,14 @@ def cpu_monitor():
             # data collections small and potentially make the data misleading due to burst loads.
             last_cpu_times = get_load_data()
             gated_loginfo(quiet, "CPU load not yet available")
+            # The load is left at 0 in the message until it is available, but NaN is clearer for shared memory readers.
+            overall_cpu_load = float("NaN")
         else:
             overall_load, per_cores, last_cpu_times = get_cpu_load(last_cpu_times)
             gated_loginfo(quiet, "Overall CPU load: " + str(round(overall_load * 100, 1)) + "%")
             data.overall_cpu_load = overall_load
+            overall_cpu_load = overall_load
+            rate.add_sample(overall_load)
             if(len(per_cores) > 0):
                 for core in range(len(per_cores)):
                     gated_loginfo(quiet, "CPU core " + str(core) + " load: " + str(round(per_cores[core] * 100, 1)) + 
@@ -217,6 +230,12 @@ def cpu_monitor():
         data.header = header
         
         pub.publish(data)
+        if(shm_writer is not None):
+            shm_writer.write(header.stamp.to_sec(), overall_cpu_load, data.package_temp, data.core_loads,
+                             data.core_temps)
+        if(not has_published):
+            log_startup_time(loginfo, logwarn)
+            has_published = True
         rate.sleep()
 
 
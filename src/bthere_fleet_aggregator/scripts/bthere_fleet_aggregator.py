@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+from rospy import init_node, loginfo, logwarn, ROSInterruptException, Publisher, Subscriber, Rate, is_shutdown, \
+    get_param, get_published_topics, Time, ROSException, AnyMsg
+from bthere_sensor_msgs.msg import CPUData, NetworkData, WifiData, FleetSummary
+from sensor_msgs.msg import BatteryState
+from std_msgs.msg import Header
+from bthere_sensor_common.fleet import FleetState, unpack_cpu_data, unpack_network_data, unpack_wifi_data, \
+    get_battery_percentage_offset, unpack_battery_percentage, CPU_LOAD, PACKAGE_TEMP, RX_RATE, TX_RATE, \
+    SIGNAL_LEVEL, BATTERY_PERCENTAGE
+import time
+
+# The topics each robot's sensor nodes publish to, relative to the robot's namespace.
+CPU_TOPIC = "bthere/cpu_data"
+NETWORK_TOPIC = "bthere/network_data"
+WIFI_TOPIC = "bthere/wifi_signal"
+BATTERY_TOPIC = "bthere/battery_state"
+ROBOT_TOPICS = [CPU_TOPIC, NETWORK_TOPIC, WIFI_TOPIC, BATTERY_TOPIC]
+
+BATTERY_PERCENTAGE_OFFSET = get_battery_percentage_offset(BatteryState.__slots__)
+
+
+def is_message_type(message, message_class):
+    """Checks that the publisher of the raw message is publishing message_class (with the same definition), since
+    AnyMsg subscribers accept any type.
+    """
+
+    return message._connection_header.get("md5sum") == message_class._md5sum
+
+
+class FleetAggregator(object):
+    """Subscribes to the sensor topics of every robot and keeps a FleetState up to date.
+
+    Messages are received as rospy.AnyMsg, so the only object rospy creates per message is the AnyMsg holding the
+    serialized bytes. The callbacks unpack the few fields they need straight from those bytes (see
+    bthere_sensor_common.fleet).
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.message_count = 0
+
+    def subscribe(self, namespace):
+        """Subscribes to the sensor topics under namespace (e.g. "/robot_1") if they aren't already."""
+
+        namespace = "/" + namespace.strip("/")
+        if(namespace in self.state.slots):
+            return
+        slot = self.state.add_robot(namespace)
+        prefix = namespace.rstrip("/") + "/"
+        # The slot is passed as the callback argument, so there is no per-robot lookup when a message arrives.
+        Subscriber(prefix + CPU_TOPIC, AnyMsg, self.on_cpu_data, callback_args=slot, queue_size=1)
+        Subscriber(prefix + NETWORK_TOPIC, AnyMsg, self.on_network_data, callback_args=slot, queue_size=1)
+        Subscriber(prefix + WIFI_TOPIC, AnyMsg, self.on_wifi_data, callback_args=slot, queue_size=1)
+        Subscriber(prefix + BATTERY_TOPIC, AnyMsg, self.on_battery_state, callback_args=slot, queue_size=1)
+        loginfo("Aggregating robot " + namespace)
+
+    def discover(self):
+        """Subscribes to every namespace that has one of the sensor topics published in it."""
+
+        try:
+            topics = get_published_topics()
+        except ROSException:
+            logwarn("Unable to get the published topics from the master")
+            return
+        for topic, topic_type in topics:
+            for robot_topic in ROBOT_TOPICS:
+                if(topic.endswith("/" + robot_topic)):
+                    self.subscribe(topic[:-len(robot_topic)])
+
+    def on_cpu_data(self, message, slot):
+        if(not is_message_type(message, CPUData)):
+            return
+        now = time.time()
+        overall_cpu_load, package_temp = unpack_cpu_data(message._buff)
+        with self.state.lock:
+            self.state.update(slot, CPU_LOAD, overall_cpu_load, now)
+            self.state.update(slot, PACKAGE_TEMP, package_temp, now)
+            self.message_count += 1
+
+    def on_network_data(self, message, slot):
+        if(not is_message_type(message, NetworkData)):
+            return
+        now = time.time()
+        rx_rate, tx_rate = unpack_network_data(message._buff)
+        with self.state.lock:
+            self.state.update(slot, RX_RATE, rx_rate, now)
+            self.state.update(slot, TX_RATE, tx_rate, now)
+            self.message_count += 1
+
+    def on_wifi_data(self, message, slot):
+        if(not is_message_type(message, WifiData)):
+            return
+        now = time.time()
+        signal_level = unpack_wifi_data(message._buff)
+        with self.state.lock:
+            self.state.update(slot, SIGNAL_LEVEL, float(signal_level), now)
+            self.message_count += 1
+
+    def on_battery_state(self, message, slot):
+        if(not is_message_type(message, BatteryState)):
+            return
+        now = time.time()
+        percentage = unpack_battery_percentage(message._buff, BATTERY_PERCENTAGE_OFFSET)
+        with self.state.lock:
+            self.state.update(slot, BATTERY_PERCENTAGE, percentage, now)
+            self.message_count += 1
+
+    def summarize(self, worst_count, stale_timeout):
+        """Gets a FleetSummary of the current state of the fleet."""
+
+        summary = FleetSummary()
+        state = self.state
+        with state.lock:
+            now = time.time()
+            summary.robot_count = len(state.robots)
+            summary.reporting_count = state.get_reporting_count(now, stale_timeout)
+            summary.mean_cpu_load = state.get_mean(CPU_LOAD, now, stale_timeout)
+            summary.mean_package_temp = state.get_mean(PACKAGE_TEMP, now, stale_timeout)
+            summary.mean_battery_percentage = state.get_mean(BATTERY_PERCENTAGE, now, stale_timeout)
+            summary.mean_signal_level = state.get_mean(SIGNAL_LEVEL, now, stale_timeout)
+            summary.total_rx_rate = state.get_total(RX_RATE, now, stale_timeout)
+            summary.total_tx_rate = state.get_total(TX_RATE, now, stale_timeout)
+            summary.hottest_robots, summary.hottest_package_temps, summary.hottest_package_temp_stddevs, \
+                summary.hottest_latest_package_temps = \
+                state.get_worst(PACKAGE_TEMP, now, stale_timeout, worst_count, True)
+            summary.lowest_battery_robots, summary.lowest_battery_percentages, \
+                summary.lowest_battery_percentage_stddevs, summary.lowest_battery_latest_percentages = \
+                state.get_worst(BATTERY_PERCENTAGE, now, stale_timeout, worst_count, False)
+            summary.weakest_signal_robots, summary.weakest_signal_levels, summary.weakest_signal_level_stddevs, \
+                summary.weakest_signal_latest_levels = \
+                state.get_worst(SIGNAL_LEVEL, now, stale_timeout, worst_count, False)
+        return summary
+
+
+def gated_loginfo(quiet, msg):
+    """Logs a given message (msg) to the ros INFO log depending on the quiet parameter."""
+
+    if(not quiet):
+        loginfo(msg)
+
+
+def fleet_aggregator():
+    """Publishes a summary of the sensor data of many robots to /bthere/fleet_summary."""
+
+    init_node("bthere_fleet_aggregator", anonymous=False)
+    pub = Publisher("/bthere/fleet_summary", FleetSummary, queue_size=10)
+    loginfo("Outputting to /bthere/fleet_summary")
+
+    update_period = get_param("~update_period", 1.0)
+    rate = Rate(1/float(update_period))
+    loginfo("Publishing rate: " + str(1.0/update_period) + " hz")
+
+    quiet = get_param("~quiet", False)
+    # Robots to aggregate, e.g. ["/robot_1", "/robot_2"]. If empty, robots are discovered from the published topics.
+    namespaces = get_param("~namespaces", [])
+    discovery_period = get_param("~discovery_period", 10.0)
+    worst_count = get_param("~worst_count", 5)
+    # Metrics a robot hasn't published for this long are left out of the summary.
+    stale_timeout = get_param("~stale_timeout", 60.0)
+    smoothing = get_param("~smoothing", 0.3)
+
+    aggregator = FleetAggregator(FleetState(smoothing))
+    for namespace in namespaces:
+        aggregator.subscribe(namespace)
+
+    last_discovery = None
+    last_message_count = 0
+    while not is_shutdown():
+        now = time.time()
+        if(len(namespaces) == 0 and (last_discovery is None or now - last_discovery >= discovery_period)):
+            aggregator.discover()
+            last_discovery = now
+
+        summary = aggregator.summarize(worst_count, stale_timeout)
+        # The frame_id property seems to be to do with tf frames of reference. That isn't useful for something like
+        # this, so just leave it empty. The sequential id is apparently set by the publisher.
+        summary.header = Header(stamp=Time.now())
+
+        message_count = aggregator.message_count
+        gated_loginfo(quiet, "------ Fleet Summary ------")
+        gated_loginfo(quiet, "Robots reporting: " + str(summary.reporting_count) + "/" + str(summary.robot_count))
+        gated_loginfo(quiet, "Messages received: " + str(message_count - last_message_count) + " in the last " +
+                      str(update_period) + " s")
+        gated_loginfo(quiet, "Hottest: " + str(list(zip(summary.hottest_robots, summary.hottest_package_temps))))
+        gated_loginfo(quiet, "Lowest battery: " +
+                      str(list(zip(summary.lowest_battery_robots, summary.lowest_battery_percentages))))
+        gated_loginfo(quiet, "Weakest signal: " +
+                      str(list(zip(summary.weakest_signal_robots, summary.weakest_signal_levels))))
+        last_message_count = message_count
+
+        pub.publish(summary)
+        rate.sleep()
+
+
+if __name__ == "__main__":
+    try:
+        fleet_aggregator()
+    except ROSInterruptException:
+        pass
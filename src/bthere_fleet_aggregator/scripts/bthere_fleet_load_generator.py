@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+from rospy import init_node, loginfo, ROSInterruptException, Publisher, Rate, is_shutdown, get_param, Time
+from bthere_sensor_msgs.msg import CPUData, NetworkData, WifiData
+from sensor_msgs.msg import BatteryState
+from std_msgs.msg import Header
+import random
+import time
+
+# Same constant as bthere_battery_state_monitor.
+POWER_SUPPLY_STATUS_DISCHARGING = 2
+
+
+def clamp(value, low, high):
+    return min(max(value, low), high)
+
+
+class SimulatedRobot(object):
+    """Publishes random-walk sensor data to the same topics as the bthere sensor nodes, under a namespace."""
+
+    def __init__(self, namespace):
+        prefix = namespace.rstrip("/") + "/"
+        self.cpu_pub = Publisher(prefix + "bthere/cpu_data", CPUData, queue_size=1)
+        self.network_pub = Publisher(prefix + "bthere/network_data", NetworkData, queue_size=1)
+        self.wifi_pub = Publisher(prefix + "bthere/wifi_signal", WifiData, queue_size=1)
+        self.battery_pub = Publisher(prefix + "bthere/battery_state", BatteryState, queue_size=1)
+        self.cpu_load = random.uniform(0.05, 0.6)
+        self.package_temp = random.uniform(40.0, 70.0)
+        self.rx_rate = random.uniform(10.0, 500.0)
+        self.tx_rate = random.uniform(10.0, 500.0)
+        self.signal_level = random.uniform(-80.0, -40.0)
+        self.battery_percentage = random.uniform(20.0, 100.0)
+
+    def step(self):
+        """Moves every value a small random step."""
+
+        self.cpu_load = clamp(self.cpu_load + random.gauss(0, 0.05), 0.0, 1.0)
+        self.package_temp = clamp(self.package_temp + random.gauss(0, 0.5) + (self.cpu_load - 0.5), 30.0, 100.0)
+        self.rx_rate = max(self.rx_rate + random.gauss(0, 20.0), 0.0)
+        self.tx_rate = max(self.tx_rate + random.gauss(0, 20.0), 0.0)
+        self.signal_level = clamp(self.signal_level + random.gauss(0, 2.0), -95.0, -30.0)
+        self.battery_percentage = max(self.battery_percentage - random.uniform(0.0, 0.05), 0.0)
+
+    def publish(self, stamp):
+        header = Header(stamp=stamp)
+
+        cpu_data = CPUData()
+        cpu_data.header = header
+        cpu_data.overall_cpu_load = self.cpu_load
+        cpu_data.core_loads = [self.cpu_load] * 4
+        cpu_data.package_temp = self.package_temp
+        cpu_data.core_temps = [self.package_temp] * 4
+        self.cpu_pub.publish(cpu_data)
+
+        network_data = NetworkData()
+        network_data.header = header
+        network_data.rx_rate = self.rx_rate
+        network_data.tx_rate = self.tx_rate
+        self.network_pub.publish(network_data)
+
+        wifi_data = WifiData()
+        wifi_data.header = header
+        wifi_data.data = int(self.signal_level)
+        self.wifi_pub.publish(wifi_data)
+
+        battery_state = BatteryState()
+        battery_state.header = header
+        battery_state.voltage = 12.0
+        battery_state.current = float("NaN")
+        battery_state.percentage = self.battery_percentage
+        battery_state.power_supply_status = POWER_SUPPLY_STATUS_DISCHARGING
+        battery_state.present = True
+        self.battery_pub.publish(battery_state)
+
+
+def fleet_load_generator():
+    """Simulates a fleet of robots in one process, for testing bthere_fleet_aggregator."""
+
+    init_node("bthere_fleet_load_generator", anonymous=False)
+    robot_count = get_param("~robot_count", 200)
+    namespace_prefix = get_param("~namespace_prefix", "/robot_")
+    update_period = get_param("~update_period", 1.0)
+    rate = Rate(1/float(update_period))
+
+    robots = [SimulatedRobot(namespace_prefix + "%03d" % index) for index in range(robot_count)]
+    loginfo("Simulating " + str(robot_count) + " robots (" + namespace_prefix + "000 to " + namespace_prefix +
+            "%03d" % (robot_count - 1) + "), publishing rate: " + str(1.0/update_period) + " hz")
+
+    while not is_shutdown():
+        start = time.time()
+        stamp = Time.now()
+        for robot in robots:
+            robot.step()
+            robot.publish(stamp)
+        elapsed = time.time() - start
+        if(elapsed > update_period):
+            loginfo("Publishing for all robots took " + str(round(elapsed, 3)) + " s, longer than the update period")
+        rate.sleep()
+
+
+if __name__ == "__main__":
+    try:
+        fleet_load_generator()
+    except ROSInterruptException:
+        pass
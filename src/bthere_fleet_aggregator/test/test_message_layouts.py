@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+import os
+import unittest
+
+from bthere_sensor_common.fleet import CPU_DATA_FIELDS, NETWORK_DATA_FIELDS, WIFI_DATA_FIELDS
+
+MSG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "bthere_sensor_msgs", "msg")
+
+
+def get_fields(message_name):
+    """Gets the fields declared in bthere_sensor_msgs/msg/<message_name>.msg, as "type name"."""
+
+    with open(os.path.join(MSG_DIR, message_name + ".msg")) as msg_file:
+        lines = [line.split("#")[0] for line in msg_file]
+    return [" ".join(line.split()) for line in lines if len(line.strip()) > 0]
+
+
+class TestMessageLayouts(unittest.TestCase):
+    """The aggregator unpacks raw messages at fixed offsets, so the messages must still start with the fields it
+    expects. If one of these fails, update the unpack functions in bthere_sensor_common.fleet along with the fields.
+    """
+
+    def assert_starts_with(self, message_name, fields):
+        self.assertEqual(get_fields(message_name)[:len(fields)], fields)
+
+    def test_cpu_data(self):
+        self.assert_starts_with("CPUData", CPU_DATA_FIELDS)
+
+    def test_network_data(self):
+        self.assert_starts_with("NetworkData", NETWORK_DATA_FIELDS)
+
+    def test_wifi_data(self):
+        self.assert_starts_with("WifiData", WIFI_DATA_FIELDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+from rospy import init_node, loginfo, logwarn, logerr, ROSInterruptException, Publisher, is_shutdown, get_param, Time
+from bthere_sensor_msgs.msg import LinkQuality
+from std_msgs.msg import Header
+from bthere_sensor_common.capabilities import get_capabilities
+from bthere_sensor_common.wifi import get_connected_interface, get_signal_level, get_iwconfig_output, \
+    get_iwconfig_bit_rate
+from bthere_sensor_common.link_probe import ProbeWindow, send_probe, receive_replies, monotonic
+from select import select
+from threading import Thread
+import socket
+import time
+
+
+class WifiSampler(Thread):
+    """Samples the wifi interface, signal level and bit rate in the background, since running nmcli and iwconfig
+    takes long enough to throw off the probe schedule.
+    """
+
+    def __init__(self, period, use_proc_wireless, has_iwconfig):
+        Thread.__init__(self)
+        self.daemon = True
+        self.period = period
+        self.use_proc_wireless = use_proc_wireless
+        self.has_iwconfig = has_iwconfig
+        self.interface = ""
+        self.signal_level = float("NaN")
+        self.bit_rate = float("NaN")
+
+    def run(self):
+        while not is_shutdown():
+            interface = ""
+            signal_level = float("NaN")
+            bit_rate = float("NaN")
+            try:
+                connected_interface = get_connected_interface()
+                if(connected_interface is not None):
+                    interface = connected_interface
+                    level = get_signal_level(interface, self.use_proc_wireless)
+                    if(level is not None):
+                        signal_level = float(level)
+                    if(self.has_iwconfig):
+                        bit_rate = get_iwconfig_bit_rate(get_iwconfig_output(interface))
+            except Exception as error:
+                # e.g. a driver reporting the signal level as "60/100", or /proc/net/wireless being unreadable. Keep
+                # sampling, but don't let the last good values be published as if they were current.
+                logerr("Unable to sample the wifi interface: " + str(error))
+                interface = ""
+                signal_level = float("NaN")
+                bit_rate = float("NaN")
+            # Each attribute is replaced in one assignment, so the main thread never sees half an update of one.
+            self.interface = interface
+            self.signal_level = signal_level
+            self.bit_rate = bit_rate
+            time.sleep(self.period)
+
+
+def gated_loginfo(quiet, msg):
+    """Logs a given message (msg) to the ros INFO log depending on the quiet parameter."""
+
+    if(not quiet):
+        loginfo(msg)
+
+
+def link_quality_monitor():
+    """Probes a UDP echo endpoint and publishes link quality to /bthere/link_quality."""
+
+    init_node("bthere_link_quality_monitor", anonymous=False)
+    pub = Publisher("/bthere/link_quality", LinkQuality, queue_size=10)
+    loginfo("Outputting to /bthere/link_quality")
+
+    target_host = get_param("~target_host", "127.0.0.1")
+    target_port = get_param("~target_port", 7777)
+    probe_period = float(get_param("~probe_period", 0.1))
+    probe_size = get_param("~probe_size", 64)
+    probe_timeout = float(get_param("~probe_timeout", 1.0))
+    window_length = float(get_param("~window", 10.0))
+    update_period = float(get_param("~update_period", 1.0))
+    wifi_period = float(get_param("~wifi_period", 5.0))
+    quiet = get_param("~quiet", False)
+    target = target_host + ":" + str(target_port)
+    loginfo("Probing " + target + " every " + str(probe_period) + " s, publishing rate: " + str(1.0/update_period) +
+            " hz")
+
+    capabilities = get_capabilities()
+    if(capabilities["tools"]["nmcli"] is not None):
+        wifi_sampler = WifiSampler(wifi_period, capabilities["proc_net_wireless"],
+                                   capabilities["tools"]["iwconfig"] is not None)
+        wifi_sampler.start()
+    else:
+        logwarn("nmcli is not installed, wifi signal level and bit rate will be NaN")
+        wifi_sampler = None
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # Connecting resolves the host once and makes the socket ignore datagrams from anywhere else.
+        sock.connect((target_host, target_port))
+    except socket.error as error:
+        logerr("Unable to use " + target + " as the probe target: " + str(error))
+        return
+    sock.setblocking(0)
+
+    window = ProbeWindow(window_length, probe_timeout)
+    sequence = 0
+    # Probes are sent on a fixed schedule rather than a fixed delay after the last one, so that the time spent
+    # receiving and publishing doesn't make the probe period drift.
+    next_probe = monotonic()
+    next_publish = next_probe + update_period
+    while not is_shutdown():
+        now = monotonic()
+        if(next_probe - now > probe_period or next_publish - now > update_period):
+            # The clock went backwards (only possible without a monotonic clock); restart the schedule from now
+            # rather than waiting for the size of the jump. The probes sent before the jump can't be timed any more.
+            next_probe = now
+            window = ProbeWindow(window_length, probe_timeout)
+            next_publish = now + update_period
+        if(now >= next_probe):
+            window.sent(sequence, now)
+            send_probe(sock, sequence, probe_size)
+            sequence = (sequence + 1) & 0xFFFFFFFF
+            next_probe += probe_period
+            if(next_probe < now):
+                # Fell behind by more than a period; skip the missed probes rather than sending a burst.
+                next_probe = now + probe_period
+
+        if(now >= next_publish):
+            window.trim(now)
+            stats = window.get_stats(now)
+            message = LinkQuality()
+            message.target = target
+            message.probes_sent = stats["SENT"]
+            message.probes_received = stats["RECEIVED"]
+            message.loss = stats["LOSS"]
+            # Times are published in ms.
+            message.rtt_min = stats["MIN"] * 1000
+            message.rtt_mean = stats["MEAN"] * 1000
+            message.rtt_p50 = stats[50] * 1000
+            message.rtt_p90 = stats[90] * 1000
+            message.rtt_p99 = stats[99] * 1000
+            message.rtt_max = stats["MAX"] * 1000
+            message.jitter = stats["JITTER"] * 1000
+            if(wifi_sampler is not None):
+                message.wifi_interface = wifi_sampler.interface
+                message.signal_level = wifi_sampler.signal_level
+                message.bit_rate = wifi_sampler.bit_rate
+            else:
+                message.signal_level = float("NaN")
+                message.bit_rate = float("NaN")
+            # The sequential id is set by the publisher, and frame_id isn't useful for this.
+            message.header = Header(stamp=Time.now())
+
+            gated_loginfo(quiet, "------ Link Quality ------")
+            gated_loginfo(quiet, "Probes answered: " + str(message.probes_received) + "/" + str(message.probes_sent) +
+                          " (loss " + str(round(message.loss * 100, 1)) + "%)")
+            gated_loginfo(quiet, "RTT (ms): p50 " + str(round(message.rtt_p50, 2)) + ", p90 " +
+                          str(round(message.rtt_p90, 2)) + ", p99 " + str(round(message.rtt_p99, 2)) + ", jitter " +
+                          str(round(message.jitter, 2)))
+            gated_loginfo(quiet, "Wifi: " + message.wifi_interface + " " + str(message.signal_level) + " dBm, " +
+                          str(message.bit_rate) + " Mb/s")
+
+            pub.publish(message)
+            next_publish += update_period
+            if(next_publish < now):
+                next_publish = now + update_period
+
+        # Wait for replies until the next thing is due.
+        timeout = min(next_probe, next_publish) - monotonic()
+        readable = select([sock], [], [], max(timeout, 0))[0]
+        if(len(readable) > 0):
+            receive_replies(sock, window)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    try:
+        link_quality_monitor()
+    except ROSInterruptException:
+        pass
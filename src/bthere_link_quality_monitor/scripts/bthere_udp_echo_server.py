@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""Sends every UDP datagram it receives straight back to its sender.
+
+This is the endpoint bthere_link_quality_monitor probes. It doesn't depend on ROS, so it can be copied to and run on
+the remote end of the link (e.g. the machine running the console), or run locally to test the monitor.
+"""
+
+import argparse
+import socket
+
+MAX_DATAGRAM_SIZE = 65535
+
+
+def echo_server(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    print("Echoing UDP datagrams on %s:%d" % (host, port))
+    try:
+        while True:
+            data, address = sock.recvfrom(MAX_DATAGRAM_SIZE)
+            sock.sendto(data, address)
+    finally:
+        sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP echo server for bthere_link_quality_monitor")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on. Default is 0.0.0.0")
+    parser.add_argument("--port", type=int, default=7777, help="port to listen on. Default is 7777")
+    # roslaunch adds arguments like __name:=NAME, which are ignored.
+    args = parser.parse_known_args()[0]
+    try:
+        echo_server(args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
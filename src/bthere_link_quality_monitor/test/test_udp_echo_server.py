@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from select import select
+
+from bthere_sensor_common.link_probe import ProbeWindow, send_probe, receive_replies, monotonic
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+import bthere_udp_echo_server
+
+
+def get_free_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestUdpEchoServer(unittest.TestCase):
+    """Probes a local echo server standing in for the remote endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.port = get_free_port()
+        # The server never returns, so it runs in a daemon thread for the rest of the test process.
+        server = threading.Thread(target=bthere_udp_echo_server.echo_server, args=("127.0.0.1", cls.port))
+        server.daemon = True
+        server.start()
+
+    def setUp(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.connect(("127.0.0.1", self.port))
+        self.sock.setblocking(0)
+
+    def tearDown(self):
+        self.sock.close()
+
+    def probe(self, window, sequences, probe_size=64):
+        """Sends the probes numbered sequences and waits up to the window's timeout for their replies."""
+
+        for sequence in sequences:
+            window.sent(sequence, monotonic())
+            send_probe(self.sock, sequence, probe_size)
+        deadline = monotonic() + window.timeout
+        while(len(window.pending) > 0 and monotonic() < deadline):
+            if(len(select([self.sock], [], [], 0.05)[0]) > 0):
+                receive_replies(self.sock, window)
+
+    def wait_for_server(self):
+        window = ProbeWindow(10.0, 0.2)
+        for attempt in range(25):
+            self.probe(window, [attempt])
+            if(window.get_stats(monotonic() + 1.0)["RECEIVED"] > 0):
+                return
+        self.fail("the echo server didn't answer")
+
+    def test_probes_are_echoed(self):
+        self.wait_for_server()
+        window = ProbeWindow(10.0, 1.0)
+        self.probe(window, range(20))
+        stats = window.get_stats(monotonic() + 2.0)
+        self.assertEqual(stats["SENT"], 20)
+        self.assertEqual(stats["RECEIVED"], 20)
+        self.assertEqual(stats["LOSS"], 0.0)
+        # loopback round trips are well under the timeout, and never negative
+        self.assertGreaterEqual(stats["MIN"], 0.0)
+        self.assertLess(stats["MAX"], 1.0)
+        self.assertLessEqual(stats[50], stats[90])
+        self.assertLessEqual(stats[90], stats[99])
+
+    def test_large_probes_are_echoed(self):
+        self.wait_for_server()
+        window = ProbeWindow(10.0, 1.0)
+        self.probe(window, [1000, 1001], probe_size=1400)
+        self.assertEqual(window.get_stats(monotonic() + 2.0)["RECEIVED"], 2)
+
+    def test_other_datagrams_ignored(self):
+        self.wait_for_server()
+        window = ProbeWindow(10.0, 0.5)
+        window.sent(5, monotonic())
+        self.sock.send(b"not a probe")
+        time.sleep(0.1)
+        receive_replies(self.sock, window)
+        self.assertEqual(window.get_stats(monotonic() + 1.0)["RECEIVED"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,8 @@ from rospy import *
 import time
 from bthere_sensor_msgs.msg import NetworkData
 from std_msgs.msg import Header
+from bthere_sensor_common.adaptive_rate import get_adaptive_rate
+from bthere_sensor_common.capabilities import log_startup_time
 
 #set to specify unit of published upload/download rate. 1000 for KB/s, 1000000 for MB/s, etc.
 RATE_UNIT_SCALAR = 1000
@@ -75,14 +77,15 @@ def network_monitor():
     pub = Publisher("/bthere/network_data", NetworkData, queue_size=10)
     loginfo("Outputting to /bthere/network_data")
 
-    update_period = get_param('~update_period', 5.0)
-    rate = Rate(1/float(update_period))
-    loginfo("Publishing rate: " + str(1.0/update_period) + " hz")
+    # With ~adaptive set, the period speeds up while the total throughput changes by 50 kB/s or more between updates.
+    rate = get_adaptive_rate(5.0, 50.0, "/bthere/network_data/update_period")
+    loginfo("Publishing rate: " + str(1.0/rate.period) + " hz")
 
     quiet = get_param("~quiet", False)
 
     last_data = None
     last_timestamp = None
+    has_published = False
 
     while not is_shutdown():
         
@@ -115,6 +118,8 @@ def network_monitor():
             gated_loginfo(quiet, "upload packets dropped total: " + str(data["TX_DROP"]))
             message.tx_drop = data["TX_DROP"]
 
+            rate.add_sample(data["RX_RATE"] + data["TX_RATE"])
+
             # Add the header information:
             header = Header(stamp=Time.now())
             # The frame_id property seems to be to do with tf frames of reference. That isn't useful for something like 
@@ -123,6 +128,9 @@ def network_monitor():
             message.header = header
             
             pub.publish(message)
+            if(not has_published):
+                log_startup_time(loginfo, logwarn)
+                has_published = True
             rate.sleep()
 
 
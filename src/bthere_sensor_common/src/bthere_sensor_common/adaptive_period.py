@@ -0,0 +1,131 @@
+"""Picks adaptive update periods for the sensor nodes.
+
+A fixed update period wastes cycles while a signal is stable and misses detail while it is changing. AdaptivePeriod is
+fed each value a node publishes, and shortens the period while recent values are volatile, and lengthens it while they
+are stable or while the host's own CPU load is high. The period always stays between a configured minimum and maximum.
+
+This module only uses the python standard library; adaptive_rate.AdaptiveRate does the sleeping with rospy.
+"""
+
+from collections import deque
+from math import isnan
+import os
+
+# Number of recent samples the volatility is calculated from.
+DEFAULT_WINDOW_SIZE = 5
+
+# Volatility (see AdaptivePeriod.get_volatility()) at or above which the period is shortened, and below which it is
+# lengthened.
+VOLATILE_THRESHOLD = 1.0
+STABLE_THRESHOLD = 0.25
+
+# The period is multiplied by these when speeding up or slowing down. Speeding up is deliberately faster than slowing
+# down so that a burst isn't missed.
+SPEED_UP_FACTOR = 0.5
+SLOW_DOWN_FACTOR = 1.25
+
+# 1 minute load average per CPU core above which monitors slow down, regardless of volatility.
+DEFAULT_LOAD_LIMIT = 0.8
+
+
+def get_cpu_count():
+    """Gets the number of CPU cores, or None if it is unknown."""
+
+    if(hasattr(os, "cpu_count")):
+        return os.cpu_count()
+    # Python 2 only has it in multiprocessing, which is imported here rather than at the top because it takes a
+    # noticeable part of a node's startup time.
+    from multiprocessing import cpu_count
+    try:
+        return cpu_count()
+    except NotImplementedError:
+        return None
+
+
+def get_host_load():
+    """Gets the 1 minute load average divided by the number of CPU cores, or NaN if it is unavailable."""
+
+    cpu_count = get_cpu_count()
+    if(cpu_count is None):
+        return float("NaN")
+    try:
+        return os.getloadavg()[0] / cpu_count
+    except OSError:
+        return float("NaN")
+
+
+class AdaptivePeriod(object):
+    """Picks an update period from the volatility of recent samples and the host's load.
+
+    If adaptive is False the period never changes.
+    """
+
+    def __init__(self, update_period, adaptive=False, min_period=None, max_period=None, volatility_scale=1.0,
+                 window_size=DEFAULT_WINDOW_SIZE, load_limit=DEFAULT_LOAD_LIMIT):
+        """parameters:
+            update_period: the initial period in seconds, and the fixed one if adaptive is False.
+            adaptive: whether to change the period at all.
+            min_period, max_period: bounds of the period in seconds. Default to a quarter of and 4 times update_period.
+            volatility_scale: the average change between consecutive samples that counts as volatile at update_period,
+                in the units of the samples (e.g. 3 for a wifi signal level in dBm). See get_volatility().
+            window_size: the number of recent samples to consider.
+            load_limit: load average per core above which the period is lengthened.
+        """
+
+        self.period = float(update_period)
+        self.base_period = self.period
+        self.adaptive = adaptive
+        self.min_period = float(min_period) if min_period is not None else self.period / 4
+        self.max_period = float(max_period) if max_period is not None else self.period * 4
+        self.volatility_scale = float(volatility_scale)
+        self.load_limit = float(load_limit)
+        self.samples = deque(maxlen=window_size)
+
+    def add_sample(self, value):
+        """Records the latest value of the monitored signal. None and NaN values are ignored."""
+
+        if(value is not None and not isnan(value)):
+            self.samples.append(float(value))
+
+    def get_volatility(self):
+        """Gets the mean absolute change between consecutive recent samples, relative to volatility_scale, scaled by
+        the current period relative to the initial one.
+        Using the change between samples rather than the spread means a steady trend (like a battery slowly
+        discharging) isn't treated as volatile unless it is fast. Scaling by the period means that at half the initial
+        period, twice the change is needed to count as volatile. Noise (e.g. wifi signal jitter, or CPU load measured
+        over a short interval) doesn't shrink when sampling faster, so without this it would hold the period at
+        min_period. A real change does shrink per sample as the period shortens, so it is still followed.
+        returns:
+            a float where values around 1 or more are volatile. 0 if there are fewer than two samples.
+        """
+
+        if(len(self.samples) < 2):
+            return 0.0
+        samples = list(self.samples)
+        total_change = 0.0
+        for i in range(1, len(samples)):
+            total_change += abs(samples[i] - samples[i - 1])
+        return total_change / (len(samples) - 1) / self.volatility_scale * (self.period / self.base_period)
+
+    def update(self, load):
+        """Picks the next period from the recent samples.
+        parameters:
+            load: the host's load average per core, as from get_host_load(). NaN if it is unavailable.
+
+        returns:
+            the new period in seconds.
+        """
+
+        if(not self.adaptive):
+            return self.period
+        new_period = self.period
+        volatility = self.get_volatility()
+        if(not isnan(load) and load > self.load_limit):
+            # Monitoring shouldn't add to the problem on an already busy host.
+            new_period = self.period * SLOW_DOWN_FACTOR
+        elif(volatility >= VOLATILE_THRESHOLD):
+            new_period = self.period * SPEED_UP_FACTOR
+        elif(volatility < STABLE_THRESHOLD):
+            new_period = self.period * SLOW_DOWN_FACTOR
+        self.period = min(max(new_period, self.min_period), self.max_period)
+        return self.period
@@ -0,0 +1,87 @@
+"""Adaptive update periods for the sensor nodes.
+
+AdaptiveRate is used in place of rospy.Rate: the node feeds it the value it just published, and it sleeps for a period
+picked by adaptive_period.AdaptivePeriod from the volatility of recent values and the host's load.
+
+Unlike the other modules in this package, this one depends on rospy.
+"""
+
+from rospy import get_param, sleep, Publisher, Time, Duration, ROSTimeMovedBackwardsException
+from std_msgs.msg import Float32
+
+from bthere_sensor_common.adaptive_period import AdaptivePeriod, get_host_load, DEFAULT_WINDOW_SIZE, \
+    DEFAULT_LOAD_LIMIT
+
+
+class AdaptiveRate(AdaptivePeriod):
+    """Sleeps for an update period picked from the volatility of recent samples and the host's load.
+
+    If adaptive is False the period never changes, so this behaves like rospy.Rate(1 / update_period).
+    The effective period is published (latched) to period_topic whenever it changes, if period_topic is given.
+    """
+
+    def __init__(self, update_period, adaptive=False, min_period=None, max_period=None, volatility_scale=1.0,
+                 window_size=DEFAULT_WINDOW_SIZE, load_limit=DEFAULT_LOAD_LIMIT, period_topic=None):
+        """parameters:
+            the same as AdaptivePeriod, and
+            period_topic: topic to publish the effective period (std_msgs/Float32, seconds) to.
+        """
+
+        AdaptivePeriod.__init__(self, update_period, adaptive, min_period, max_period, volatility_scale, window_size,
+                                load_limit)
+        self.period_pub = None
+        if(period_topic is not None):
+            self.period_pub = Publisher(period_topic, Float32, queue_size=1, latch=True)
+            self.period_pub.publish(self.period)
+        self.last_time = Time.now()
+
+    def update_period(self):
+        """Picks the next period from the recent samples and host load, and publishes it if it changed.
+        returns:
+            the new period in seconds.
+        """
+
+        if(not self.adaptive):
+            return self.period
+        last_period = self.period
+        self.update(get_host_load())
+        if(self.period != last_period and self.period_pub is not None):
+            self.period_pub.publish(self.period)
+        return self.period
+
+    def sleep(self):
+        """Sleeps until one (newly picked) period has passed since the last call. Clock jumps are handled the same
+        way as rospy.Rate.sleep().
+        """
+
+        period = Duration.from_sec(self.update_period())
+        now = Time.now()
+        if(self.last_time > now):
+            # The clock went backwards (e.g. an NTP correction). Without this, the sleep would last as long as the
+            # jump.
+            self.last_time = now
+        remaining = self.last_time + period - now
+        try:
+            if(remaining > Duration(0)):
+                sleep(remaining)
+        except ROSTimeMovedBackwardsException:
+            self.last_time = Time.now()
+            return
+        self.last_time = self.last_time + period
+        if(now - self.last_time > period * 2):
+            # The update took much longer than the period, or the clock jumped forwards; don't try to catch up.
+            self.last_time = now
+
+
+def get_adaptive_rate(default_update_period, default_volatility_scale, period_topic):
+    """Makes an AdaptiveRate configured from the node's private parameters:
+        ~update_period, ~adaptive, ~min_period, ~max_period and ~volatility_scale.
+    """
+
+    update_period = float(get_param("~update_period", default_update_period))
+    return AdaptiveRate(update_period,
+                        adaptive=get_param("~adaptive", False),
+                        min_period=get_param("~min_period", update_period / 4),
+                        max_period=get_param("~max_period", update_period * 4),
+                        volatility_scale=get_param("~volatility_scale", default_volatility_scale),
+                        period_topic=period_topic)
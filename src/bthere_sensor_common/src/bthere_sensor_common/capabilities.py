@@ -0,0 +1,195 @@
+"""Probes which data sources the sensor nodes can use on this machine.
+
+The probe only needs to happen once per boot, so the result is cached in a small json file keyed on the kernel
+version and boot id. Every node started during the same boot shares the cached result instead of searching PATH and
+/sys/class/hwmon again.
+
+This module only uses the python standard library (no rospy) so that importing it is cheap.
+"""
+
+import json
+import os
+from platform import uname, release
+
+# Bumped whenever the structure of the probe result changes, so that stale cache files are ignored.
+CACHE_VERSION = 1
+
+CACHE_FILE_NAME = "bthere_capabilities.json"
+
+# The command line tools that the nodes can make use of.
+TOOLS = ["upower", "nmcli", "iwconfig"]
+
+# The name file seems to always be "coretemp" on amd64 and "cpu_thermal" on a raspberry pi 3.
+CPU_HWMON_NAMES = ["coretemp", "cpu_thermal"]
+
+HWMON_DIR = "/sys/class/hwmon"
+BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
+WIRELESS_FILE = "/proc/net/wireless"
+
+# Target time from process start to first publish, in seconds.
+STARTUP_TARGET = 1.0
+
+
+def get_cache_path():
+    """Gets the path of the capability cache file. It lives in $ROS_HOME (~/.ros by default) next to the ros logs."""
+
+    ros_home = os.environ.get("ROS_HOME", os.path.join(os.path.expanduser("~"), ".ros"))
+    return os.path.join(ros_home, CACHE_FILE_NAME)
+
+
+def get_boot_id():
+    """Gets the random id the kernel generates on every boot, or an empty string if it is unavailable."""
+
+    try:
+        boot_id_file = open(BOOT_ID_FILE, "r")
+        boot_id = boot_id_file.read().strip()
+        boot_id_file.close()
+        return boot_id
+    except (IOError, OSError):
+        return ""
+
+
+def get_cache_key():
+    """Gets the key a cached probe result has to match to be reused: the kernel version and the boot id."""
+
+    return release() + "/" + get_boot_id()
+
+
+def find_tool(name):
+    """Gets the full path of the executable name on PATH, or None if it isn't installed."""
+
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        path = os.path.join(directory, name)
+        if(os.path.isfile(path) and os.access(path, os.X_OK)):
+            return path
+    return None
+
+
+def find_cpu_hwmon_dir():
+    """Gets the path of the hwmon directory for the CPU, or None if there isn't one.
+    note:
+        This check might not be portable to all systems- more testing and/or research might be necessary.
+    """
+
+    try:
+        hwmons = sorted(os.listdir(HWMON_DIR))
+    except OSError:
+        return None
+    for hwmon in hwmons:
+        try:
+            name_file = open(HWMON_DIR + "/" + hwmon + "/name", "r")
+            name = name_file.read().strip()
+            name_file.close()
+        except (IOError, OSError):
+            continue
+        if(name in CPU_HWMON_NAMES):
+            return HWMON_DIR + "/" + hwmon
+    return None
+
+
+def probe():
+    """Probes the machine for everything the sensor nodes can use.
+    returns:
+        a dict with the keys "architecture" (e.g. 'x86_64' or 'aarch64'), "cpu_hwmon_dir" (str or None),
+        "proc_net_wireless" (bool) and "tools" (a dict of tool name to its full path, or None if it isn't installed).
+    """
+
+    tools = {}
+    for tool in TOOLS:
+        tools[tool] = find_tool(tool)
+    return {
+        "architecture": uname()[4],
+        "cpu_hwmon_dir": find_cpu_hwmon_dir(),
+        "proc_net_wireless": os.path.exists(WIRELESS_FILE),
+        "tools": tools,
+    }
+
+
+def read_cache(cache_path, key):
+    """Gets the cached probe result stored at cache_path if it was made for key, otherwise None."""
+
+    try:
+        cache_file = open(cache_path, "r")
+        cached = json.load(cache_file)
+        cache_file.close()
+    except (IOError, OSError, ValueError):
+        return None
+    if(cached.get("version") != CACHE_VERSION or cached.get("key") != key):
+        return None
+    return cached.get("capabilities")
+
+
+def write_cache(cache_path, key, capabilities):
+    """Stores capabilities at cache_path. Failing to write the cache isn't fatal, it just means probing next time."""
+
+    # Write to a temporary file and rename it so that other nodes starting at the same time never read half a file.
+    temp_path = cache_path + "." + str(os.getpid())
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if(not os.path.isdir(cache_dir)):
+            os.makedirs(cache_dir)
+        cache_file = open(temp_path, "w")
+        json.dump({"version": CACHE_VERSION, "key": key, "capabilities": capabilities}, cache_file)
+        cache_file.close()
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError):
+        pass
+
+
+def get_capabilities(cache_path=None, refresh=False):
+    """Gets the capabilities of this machine, probing only if there isn't a cached result from the current boot.
+    parameters:
+        cache_path: where the cache file is kept. defaults to get_cache_path().
+        refresh: if True, ignore the cache and probe again.
+
+    returns:
+        the same dict as probe().
+    """
+
+    if(cache_path is None):
+        cache_path = get_cache_path()
+    key = get_cache_key()
+    if(not refresh):
+        capabilities = read_cache(cache_path, key)
+        if(capabilities is not None):
+            return capabilities
+    capabilities = probe()
+    write_cache(cache_path, key, capabilities)
+    return capabilities
+
+
+def seconds_since_process_start():
+    """Gets the time in seconds since the current process was started, as measured by the kernel. Unlike a
+    timestamp taken in the script itself, this includes interpreter startup and module imports.
+    returns:
+        the time in seconds, or NaN if /proc is unavailable.
+    """
+
+    try:
+        stat_file = open("/proc/self/stat", "r")
+        stat = stat_file.read()
+        stat_file.close()
+        uptime_file = open("/proc/uptime", "r")
+        uptime = float(uptime_file.read().split()[0])
+        uptime_file.close()
+        # The process name (field 2) is in parentheses and may contain spaces, so split after it. The start time
+        # (field 22) is measured in clock ticks since boot.
+        start_ticks = int(stat[stat.rfind(")") + 2:].split()[19])
+        return uptime - float(start_ticks) / os.sysconf("SC_CLK_TCK")
+    except (IOError, OSError, ValueError, IndexError):
+        return float("NaN")
+
+
+def log_startup_time(loginfo, logwarn):
+    """Logs the time from process start to the first publish, warning if it is over STARTUP_TARGET. Nodes call this
+    once, after their first publish.
+    parameters:
+        loginfo, logwarn: the functions to log with, e.g. rospy.loginfo and rospy.logwarn (this module doesn't import
+        rospy).
+    """
+
+    startup_time = seconds_since_process_start()
+    if(startup_time > STARTUP_TARGET):
+        logwarn("Time from process start to first publish: %.3f s (target is %.1f s)" % (startup_time, STARTUP_TARGET))
+    else:
+        loginfo("Time from process start to first publish: %.3f s" % startup_time)
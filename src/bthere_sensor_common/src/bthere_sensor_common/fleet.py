@@ -0,0 +1,199 @@
+"""Keeps the state of a fleet of robots for bthere_fleet_aggregator, and unpacks the sensor messages it aggregates.
+
+The aggregator subscribes with rospy.AnyMsg, which keeps a message as its serialized bytes, and the unpack functions
+here read only the fields it needs from them. Deserializing every message into a CPUData, BatteryState, etc. (with its
+Header and per-core lists) would cost far more than updating FleetState.
+
+Serialized messages are little-endian; the Header is uint32 seq, uint32 secs, uint32 nsecs, string frame_id (uint32
+length, then the characters), and a variable length array is a uint32 length, then the values.
+
+This module only uses the python standard library, so it can be tested without ROS.
+"""
+
+from array import array
+from heapq import nlargest, nsmallest
+from math import isnan, sqrt
+from threading import Lock
+import struct
+
+# Metrics that rolling statistics are kept for. Each one is a column in FleetState.
+CPU_LOAD = 0
+PACKAGE_TEMP = 1
+RX_RATE = 2
+TX_RATE = 3
+SIGNAL_LEVEL = 4
+BATTERY_PERCENTAGE = 5
+METRIC_COUNT = 6
+
+UINT32 = struct.Struct("<I")
+INT32 = struct.Struct("<i")
+FLOAT32 = struct.Struct("<f")
+FRAME_ID_LENGTH_OFFSET = 12
+
+# The leading fields of the bthere_sensor_msgs messages that the unpack functions rely on, as they are declared in the
+# .msg files. Fields can be added after these without changing anything here.
+CPU_DATA_FIELDS = ["Header header", "float32 overall_cpu_load", "float32[] core_loads", "float32 package_temp"]
+NETWORK_DATA_FIELDS = ["Header header", "float32 rx_rate", "int32 rx_packets", "int32 rx_drop", "int32 rx_errors",
+                       "float32 tx_rate"]
+WIFI_DATA_FIELDS = ["Header header", "int32 data"]
+
+
+def get_header_size(buff):
+    """Gets the size of the serialized Header at the start of buff, i.e. the offset of the message's own fields."""
+
+    return FRAME_ID_LENGTH_OFFSET + UINT32.size + UINT32.unpack_from(buff, FRAME_ID_LENGTH_OFFSET)[0]
+
+
+def unpack_cpu_data(buff):
+    """Gets the overall_cpu_load and package_temp of a serialized CPUData (see CPU_DATA_FIELDS)."""
+
+    offset = get_header_size(buff)
+    core_count = UINT32.unpack_from(buff, offset + 4)[0]
+    return FLOAT32.unpack_from(buff, offset)[0], FLOAT32.unpack_from(buff, offset + 8 + 4 * core_count)[0]
+
+
+def unpack_network_data(buff):
+    """Gets the rx_rate and tx_rate of a serialized NetworkData (see NETWORK_DATA_FIELDS)."""
+
+    offset = get_header_size(buff)
+    return FLOAT32.unpack_from(buff, offset)[0], FLOAT32.unpack_from(buff, offset + 16)[0]
+
+
+def unpack_wifi_data(buff):
+    """Gets the signal level (data) of a serialized WifiData (see WIFI_DATA_FIELDS)."""
+
+    return INT32.unpack_from(buff, get_header_size(buff))[0]
+
+
+def get_battery_percentage_offset(slots):
+    """Gets the offset of percentage in a serialized sensor_msgs/BatteryState, from the end of its Header.
+    parameters:
+        slots: BatteryState.__slots__. Every field from voltage to percentage is a float32, but ROS Noetic added
+            temperature among them, so the offset depends on the installed message definition.
+    """
+
+    return FLOAT32.size * (slots.index("percentage") - slots.index("voltage"))
+
+
+def unpack_battery_percentage(buff, percentage_offset):
+    """Gets the percentage of a serialized BatteryState, with percentage_offset from get_battery_percentage_offset()."""
+
+    return FLOAT32.unpack_from(buff, get_header_size(buff) + percentage_offset)[0]
+
+
+class FleetState(object):
+    """The latest state and rolling statistics of every robot in the fleet.
+
+    The state is stored in columns: one array of doubles per metric, indexed by a slot number given to each robot
+    when it is first seen. Updating a robot only overwrites numbers in place, and summarizing the fleet only walks
+    flat arrays. Together with unpacking raw messages, this is what keeps hundreds of robots manageable.
+
+    Rolling statistics are exponentially weighted means and variances, so they take constant memory per robot. Each
+    metric also has its own latest value and last seen time, so a robot whose battery monitor has stopped still has
+    its CPU data summarized, but its last battery percentage isn't.
+    """
+
+    def __init__(self, smoothing):
+        """parameters:
+            smoothing: weight (0-1) of the newest sample in the rolling statistics. Higher reacts faster.
+        """
+
+        self.smoothing = float(smoothing)
+        self.lock = Lock()
+        self.robots = [] # namespace of each slot
+        self.slots = {} # slot of each namespace
+        self.last_seen = [array("d") for metric in range(METRIC_COUNT)]
+        self.latest = [array("d") for metric in range(METRIC_COUNT)]
+        self.means = [array("d") for metric in range(METRIC_COUNT)]
+        self.variances = [array("d") for metric in range(METRIC_COUNT)]
+
+    def add_robot(self, namespace):
+        """Gives namespace a slot if it doesn't have one yet.
+        returns:
+            the slot of the robot.
+        """
+
+        with self.lock:
+            if(namespace in self.slots):
+                return self.slots[namespace]
+            slot = len(self.robots)
+            self.robots.append(namespace)
+            self.slots[namespace] = slot
+            for metric in range(METRIC_COUNT):
+                self.last_seen[metric].append(float("NaN"))
+                self.latest[metric].append(float("NaN"))
+                self.means[metric].append(float("NaN"))
+                self.variances[metric].append(float("NaN"))
+            return slot
+
+    def update(self, slot, metric, value, now):
+        """Adds a new sample of metric for the robot in slot to its rolling statistics. NaN samples are ignored."""
+
+        if(isnan(value)):
+            return
+        means = self.means[metric]
+        variances = self.variances[metric]
+        mean = means[slot]
+        if(isnan(mean)):
+            means[slot] = value
+            variances[slot] = 0.0
+        else:
+            # Incremental exponentially weighted mean and variance (see "Incremental calculation of weighted mean
+            # and variance", Tony Finch, 2009).
+            difference = value - mean
+            increment = self.smoothing * difference
+            means[slot] = mean + increment
+            variances[slot] = (1 - self.smoothing) * (variances[slot] + difference * increment)
+        self.latest[metric][slot] = value
+        self.last_seen[metric][slot] = now
+
+    def get_fresh_slots(self, metric, now, stale_timeout):
+        """Gets the slots of robots that have had a sample of metric within stale_timeout seconds of now."""
+
+        last_seen = self.last_seen[metric]
+        # Robots without a sample yet have a last seen time of NaN, which is never within the timeout.
+        return [slot for slot in range(len(last_seen)) if now - last_seen[slot] < stale_timeout]
+
+    def get_reporting_count(self, now, stale_timeout):
+        """Gets the number of robots that have had a sample of any metric within stale_timeout seconds of now."""
+
+        reporting = set()
+        for metric in range(METRIC_COUNT):
+            reporting.update(self.get_fresh_slots(metric, now, stale_timeout))
+        return len(reporting)
+
+    def get_mean(self, metric, now, stale_timeout):
+        """Gets the average of the rolling means of metric over the robots it is fresh for, or NaN if there are
+        none.
+        """
+
+        means = self.means[metric]
+        values = [means[slot] for slot in self.get_fresh_slots(metric, now, stale_timeout)]
+        if(len(values) == 0):
+            return float("NaN")
+        return sum(values) / len(values)
+
+    def get_total(self, metric, now, stale_timeout):
+        """Gets the sum of the rolling means of metric over the robots it is fresh for."""
+
+        means = self.means[metric]
+        return sum(means[slot] for slot in self.get_fresh_slots(metric, now, stale_timeout))
+
+    def get_worst(self, metric, now, stale_timeout, count, highest):
+        """Gets the count robots with the highest (or lowest, if highest is False) rolling mean of metric, out of the
+        robots it is fresh for.
+        returns:
+            a tuple of (str[], float[], float[], float[]): namespaces, rolling means, rolling standard deviations
+            and latest values, worst first.
+        """
+
+        means = self.means[metric]
+        candidates = self.get_fresh_slots(metric, now, stale_timeout)
+        if(highest):
+            worst = nlargest(count, candidates, key=means.__getitem__)
+        else:
+            worst = nsmallest(count, candidates, key=means.__getitem__)
+        variances = self.variances[metric]
+        latest = self.latest[metric]
+        return ([self.robots[slot] for slot in worst], [means[slot] for slot in worst],
+                [sqrt(variances[slot]) for slot in worst], [latest[slot] for slot in worst])
@@ -0,0 +1,128 @@
+"""Probes a UDP echo endpoint to measure round trip times, jitter and loss. Used by bthere_link_quality_monitor.
+
+Each probe is a UDP datagram starting with PROBE_MAGIC and a sequence number, padded to the probe size. The echo
+server (bthere_udp_echo_server.py) sends it back unchanged.
+
+This module only uses the python standard library.
+"""
+
+from collections import deque
+from math import ceil
+import socket
+import struct
+import time
+
+# Send times are kept locally, so they don't need to be in the probe.
+PROBE_MAGIC = b"BTLQ"
+PROBE_FORMAT = "!4sI"
+PROBE_HEADER_SIZE = struct.calcsize(PROBE_FORMAT)
+
+# Largest datagram the monitor expects to receive.
+MAX_REPLY_SIZE = 2048
+
+PERCENTILES = [50, 90, 99]
+
+# Probes are scheduled and timed with a monotonic clock where there is one (python 3), so that the wall clock being
+# set (e.g. by NTP) doesn't stall the schedule or produce bogus round trip times.
+monotonic = getattr(time, "monotonic", time.time)
+
+
+class ProbeWindow(object):
+    """Send times and round trip times of the probes sent within a sliding window of time."""
+
+    def __init__(self, window, timeout):
+        """parameters:
+            window: how long probes are kept for, in seconds.
+            timeout: how long after being sent a probe without a reply counts as lost, in seconds. Later replies are
+                ignored.
+        """
+
+        self.window = float(window)
+        self.timeout = float(timeout)
+        self.probes = deque() # [sequence number, send time, round trip time or None], oldest first
+        self.pending = {} # the probes that haven't been answered yet, by sequence number
+
+    def sent(self, sequence, send_time):
+        probe = [sequence, send_time, None]
+        self.probes.append(probe)
+        self.pending[sequence] = probe
+
+    def received(self, sequence, receive_time):
+        probe = self.pending.pop(sequence, None)
+        if(probe is None):
+            return
+        rtt = receive_time - probe[1]
+        # A negative round trip time means the clock went backwards (only possible without a monotonic clock).
+        if(0 <= rtt <= self.timeout):
+            probe[2] = rtt
+
+    def trim(self, now):
+        """Drops the probes sent before the start of the window."""
+
+        while(len(self.probes) > 0 and self.probes[0][1] < now - self.window):
+            self.pending.pop(self.probes.popleft()[0], None)
+
+    def get_stats(self, now):
+        """Gets the statistics of the probes in the window. Unanswered probes that are still within the timeout
+        aren't counted yet.
+        returns:
+            a dict with the keys "SENT", "RECEIVED", "LOSS" (0-1), "MIN", "MEAN", "MAX", "JITTER", and one key per
+            percentile in PERCENTILES (e.g. 90). Times are in seconds, and NaN if no probes were answered.
+        """
+
+        rtts = [] # in the order the probes were sent, for the jitter
+        sent = 0
+        for sequence, send_time, rtt in self.probes:
+            if(rtt is not None):
+                rtts.append(rtt)
+                sent += 1
+            elif(now - send_time > self.timeout):
+                sent += 1
+        stats = {"SENT": sent, "RECEIVED": len(rtts)}
+        stats["LOSS"] = 1 - float(len(rtts)) / sent if sent > 0 else float("NaN")
+        if(len(rtts) == 0):
+            for key in ["MIN", "MEAN", "MAX", "JITTER"] + PERCENTILES:
+                stats[key] = float("NaN")
+            return stats
+        # Jitter as the mean absolute difference between consecutive round trip times, like RFC 3550 but not
+        # smoothed.
+        jitter = 0.0
+        for i in range(1, len(rtts)):
+            jitter += abs(rtts[i] - rtts[i - 1])
+        stats["JITTER"] = jitter / (len(rtts) - 1) if len(rtts) > 1 else 0.0
+        stats["MEAN"] = sum(rtts) / len(rtts)
+        rtts.sort()
+        stats["MIN"] = rtts[0]
+        stats["MAX"] = rtts[-1]
+        for percentile in PERCENTILES:
+            # nearest-rank percentile
+            rank = int(ceil(percentile / 100.0 * len(rtts)))
+            stats[percentile] = rtts[max(rank - 1, 0)]
+        return stats
+
+
+def send_probe(sock, sequence, probe_size):
+    """Sends probe number sequence. Send errors (e.g. no route to the target) are ignored: the probe is lost."""
+
+    probe = struct.pack(PROBE_FORMAT, PROBE_MAGIC, sequence)
+    probe += b"\0" * max(probe_size - PROBE_HEADER_SIZE, 0)
+    try:
+        sock.send(probe)
+    except socket.error:
+        pass
+
+
+def receive_replies(sock, window):
+    """Reads every reply waiting on sock and records it in window."""
+
+    while True:
+        try:
+            reply = sock.recv(MAX_REPLY_SIZE)
+        except socket.error:
+            # Nothing left to read, or an ICMP error from an earlier probe (e.g. port unreachable).
+            return
+        receive_time = monotonic()
+        if(len(reply) >= PROBE_HEADER_SIZE):
+            magic, sequence = struct.unpack_from(PROBE_FORMAT, reply)
+            if(magic == PROBE_MAGIC):
+                window.received(sequence, receive_time)
@@ -0,0 +1,211 @@
+"""Shares the latest sample of a monitor with other processes on the same machine through shared memory.
+
+Going through a ROS topic means serializing and deserializing every sample, which adds up for a local process
+polling at a high rate (e.g. a safety supervisor polling at 50 Hz). Instead, a monitor can write each sample into a
+small file in /dev/shm with a fixed binary layout, which readers map into memory and poll directly.
+
+This module only uses the python standard library, so readers don't need ROS. For example:
+
+    from bthere_sensor_common.shm_channel import SampleReader, CPU_LAYOUT
+
+    reader = SampleReader("bthere_cpu_data", CPU_LAYOUT)
+    sample = reader.read() # a CpuSample, or None if nothing has been written yet
+    if(sample is not None):
+        print(sample.package_temp)
+
+Segment layout (little-endian, no padding):
+
+    offset  type     field
+    0       char[4]  magic, "BTSM"
+    4       uint16   layout version (LAYOUT_VERSION)
+    6       uint16   layout kind (e.g. CPU_LAYOUT.kind)
+    8       uint32   sequence number
+    12      uint32   payload size in bytes
+    16      ...      payload, see CpuLayout and BatteryLayout
+
+The sequence number is a seqlock: the writer makes it odd before changing the payload and even again afterwards, so a
+reader that sees the same even number before and after unpacking the payload knows it read a whole sample. Python has
+no memory fences, so on weakly ordered CPUs this relies on the writer's interpreter overhead between steps.
+Readers unpack straight out of the mapping with struct.unpack_from, so the segment is never copied.
+"""
+
+from collections import namedtuple
+import mmap
+import os
+import stat
+import struct
+
+SHM_DIR = "/dev/shm"
+
+MAGIC = b"BTSM"
+LAYOUT_VERSION = 1
+HEADER_FORMAT = "<4sHHII"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SEQUENCE_FORMAT = "<I"
+SEQUENCE_OFFSET = 8
+
+# How many times a reader retries when it catches the writer in the middle of a sample.
+DEFAULT_READ_RETRIES = 100
+
+# Per-core values beyond this many cores are dropped.
+MAX_CORES = 64
+
+CpuSample = namedtuple("CpuSample", ["sequence", "stamp", "overall_cpu_load", "package_temp", "core_loads",
+                                     "core_temps"])
+
+BatterySample = namedtuple("BatterySample", ["sequence", "stamp", "voltage", "current", "charge", "capacity",
+                                             "design_capacity", "percentage", "power_supply_status",
+                                             "power_supply_health", "power_supply_technology", "present"])
+
+
+class CpuLayout(object):
+    """Payload: stamp (double, seconds since the epoch), overall_cpu_load (double), package_temp (double),
+    core load count (uint32), core temperature count (uint32), then MAX_CORES core loads (float) and MAX_CORES core
+    temperatures (float), of which only the first counts are used. Same units as CPUData.
+    """
+
+    kind = 1
+    payload = struct.Struct("<dddII%df%df" % (MAX_CORES, MAX_CORES))
+
+    def pack_into(self, buffer, offset, stamp, overall_cpu_load, package_temp, core_loads, core_temps):
+        core_loads = list(core_loads[:MAX_CORES])
+        core_temps = list(core_temps[:MAX_CORES])
+        padded_loads = core_loads + [float("NaN")] * (MAX_CORES - len(core_loads))
+        padded_temps = core_temps + [float("NaN")] * (MAX_CORES - len(core_temps))
+        values = [stamp, overall_cpu_load, package_temp, len(core_loads), len(core_temps)] + padded_loads + \
+            padded_temps
+        self.payload.pack_into(buffer, offset, *values)
+
+    def unpack_from(self, buffer, offset, sequence):
+        values = self.payload.unpack_from(buffer, offset)
+        load_count = values[3]
+        temp_count = values[4]
+        core_loads = values[5:5 + load_count]
+        core_temps = values[5 + MAX_CORES:5 + MAX_CORES + temp_count]
+        return CpuSample(sequence, values[0], values[1], values[2], core_loads, core_temps)
+
+
+class BatteryLayout(object):
+    """Payload: stamp (double, seconds since the epoch), voltage, current, charge, capacity, design_capacity and
+    percentage (doubles), power_supply_status, power_supply_health, power_supply_technology and present (uint8s).
+    Same units and constants as sensor_msgs/BatteryState.
+    """
+
+    kind = 2
+    payload = struct.Struct("<dddddddBBBB")
+
+    def pack_into(self, buffer, offset, stamp, voltage, current, charge, capacity, design_capacity, percentage,
+                  power_supply_status, power_supply_health, power_supply_technology, present):
+        self.payload.pack_into(buffer, offset, stamp, voltage, current, charge, capacity, design_capacity, percentage,
+                               power_supply_status, power_supply_health, power_supply_technology, int(bool(present)))
+
+    def unpack_from(self, buffer, offset, sequence):
+        values = self.payload.unpack_from(buffer, offset)
+        return BatterySample(sequence, *(values[:-1] + (bool(values[-1]),)))
+
+
+CPU_LAYOUT = CpuLayout()
+BATTERY_LAYOUT = BatteryLayout()
+
+
+def get_segment_path(name):
+    """Gets the path of the shared memory segment called name."""
+
+    if("/" in name or len(name) == 0):
+        raise ValueError("invalid shared memory segment name: %r" % name)
+    return os.path.join(SHM_DIR, name)
+
+
+class SampleWriter(object):
+    """Writes samples to a shared memory segment. There should only be one writer per segment.
+
+    The segment is left in place when the writer is closed, so readers keep working across restarts of the monitor
+    and can tell a sample is old from its stamp.
+    """
+
+    def __init__(self, name, layout):
+        """raises:
+            IOError/OSError if the segment can't be opened, e.g. because its path is a symlink, or ValueError if it
+            isn't a regular file owned by this user.
+        """
+
+        self.layout = layout
+        size = HEADER_SIZE + layout.payload.size
+        # /dev/shm is world-writable, so someone else could have put a symlink or their own file at this path. Never
+        # follow a symlink, and check the file is ours before truncating and writing to it.
+        fd = os.open(get_segment_path(name), os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o644)
+        try:
+            status = os.fstat(fd)
+            if(not stat.S_ISREG(status.st_mode) or status.st_uid != os.geteuid()):
+                raise ValueError("shared memory segment %s isn't a regular file owned by this user" % name)
+            os.ftruncate(fd, size)
+            self.buffer = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        magic, version, kind, sequence, payload_size = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+        if(magic != MAGIC or version != LAYOUT_VERSION or kind != layout.kind):
+            sequence = 0
+        # Carry on from the previous writer's sequence number so readers keep seeing it increase, and never start
+        # on an odd one left by a writer that died in the middle of a sample.
+        self.sequence = sequence + (sequence & 1)
+        struct.pack_into(HEADER_FORMAT, self.buffer, 0, MAGIC, LAYOUT_VERSION, layout.kind, self.sequence,
+                         layout.payload.size)
+
+    def write(self, *fields):
+        """Writes a sample. The fields are the arguments of the layout's pack_into (e.g. CpuLayout.pack_into)."""
+
+        struct.pack_into(SEQUENCE_FORMAT, self.buffer, SEQUENCE_OFFSET, (self.sequence + 1) & 0xFFFFFFFF)
+        self.layout.pack_into(self.buffer, HEADER_SIZE, *fields)
+        self.sequence = (self.sequence + 2) & 0xFFFFFFFF
+        struct.pack_into(SEQUENCE_FORMAT, self.buffer, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        self.buffer.close()
+
+
+class SampleReader(object):
+    """Reads the latest sample from a shared memory segment written by a SampleWriter."""
+
+    def __init__(self, name, layout):
+        """raises:
+            IOError/OSError if the segment doesn't exist (the monitor hasn't been started with it yet), or ValueError if
+            it doesn't have the expected layout.
+        """
+
+        self.layout = layout
+        size = HEADER_SIZE + layout.payload.size
+        fd = os.open(get_segment_path(name), os.O_RDONLY)
+        try:
+            if(os.fstat(fd).st_size != size):
+                raise ValueError("shared memory segment %s doesn't have the expected layout" % name)
+            self.buffer = mmap.mmap(fd, size, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version, kind, sequence, payload_size = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+        if(magic != MAGIC or version != LAYOUT_VERSION or kind != layout.kind or payload_size != layout.payload.size):
+            self.buffer.close()
+            raise ValueError("shared memory segment %s doesn't have the expected layout" % name)
+
+    def get_sequence(self):
+        """Gets the current sequence number, which is cheap enough to poll to find out if there is a new sample.
+        It goes up by 2 for every sample written.
+        """
+
+        return struct.unpack_from(SEQUENCE_FORMAT, self.buffer, SEQUENCE_OFFSET)[0]
+
+    def read(self, retries=DEFAULT_READ_RETRIES):
+        """Gets the latest sample (e.g. a CpuSample), or None if nothing has been written yet or the writer was in the
+        middle of a sample on every try.
+        """
+
+        for attempt in range(retries):
+            sequence = self.get_sequence()
+            if(sequence & 1):
+                continue
+            sample = self.layout.unpack_from(self.buffer, HEADER_SIZE, sequence)
+            if(self.get_sequence() == sequence):
+                return sample if sequence != 0 else None
+        return None
+
+    def close(self):
+        self.buffer.close()
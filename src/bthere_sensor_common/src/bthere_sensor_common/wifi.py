@@ -0,0 +1,80 @@
+"""Samples the wifi connection: which interface is connected, its signal level and its bit rate.
+
+Used by bthere_wifi_signal_monitor and bthere_link_quality_monitor. Requires nmcli, and either /proc/net/wireless or
+iwconfig (see bthere_sensor_common.capabilities).
+"""
+
+import os
+
+from bthere_sensor_common.capabilities import WIRELESS_FILE
+
+# Bit rate units reported by iwconfig, in Mb/s.
+BIT_RATE_UNITS = {"Gb/s": 1000.0, "Mb/s": 1.0, "kb/s": 0.001}
+
+
+def get_connected_interface():
+    """Gets the name of the connected wifi interface according to nmcli, or None if there isn't one."""
+
+    cmd_output = os.popen('nmcli dev status').read()
+    interface = None
+    for line in cmd_output.splitlines():
+        if (line.find('wifi') != -1) and (line.find('connected') != -1):
+            interface = line.split()[0]
+    return interface
+
+
+def get_iwconfig_output(interface):
+    """Gets the output of iwconfig for interface."""
+
+    return os.popen('iwconfig ' + interface).read()
+
+
+def get_proc_signal_level(interface):
+    """Gets the signal level of interface in dBm from /proc/net/wireless, which is much cheaper than running
+    iwconfig. Returns None if the interface isn't listed.
+    """
+
+    wireless_file = open(WIRELESS_FILE, 'r')
+    lines = wireless_file.readlines()
+    wireless_file.close()
+    # The first two lines are column labels. The level column looks like "-56." so the trailing dot is stripped.
+    for line in lines[2:]:
+        fields = line.split()
+        if (len(fields) > 3 and fields[0].rstrip(':') == interface):
+            return int(float(fields[3].rstrip('.')))
+    return None
+
+
+def get_iwconfig_signal_level(iwconfig_output):
+    """Gets the signal level in dBm from the output of iwconfig, or None if it isn't there."""
+
+    for line in iwconfig_output.splitlines():
+        if (line.find('Signal level') != -1):
+            index = line.find('Signal level')
+            return int(line[index:].split('=')[1].split()[0])
+    return None
+
+
+def get_iwconfig_bit_rate(iwconfig_output):
+    """Gets the bit rate in Mb/s from the output of iwconfig (e.g. "Bit Rate=72.2 Mb/s"), or NaN if it isn't there."""
+
+    for line in iwconfig_output.splitlines():
+        index = line.find('Bit Rate')
+        if (index != -1):
+            # The separator is '=' or ':' depending on the driver.
+            fields = line[index + len('Bit Rate') + 1:].split()
+            if (len(fields) > 1 and fields[1] in BIT_RATE_UNITS):
+                return float(fields[0]) * BIT_RATE_UNITS[fields[1]]
+    return float('NaN')
+
+
+def get_signal_level(interface, use_proc_wireless):
+    """Gets the signal level of interface in dBm, from /proc/net/wireless if use_proc_wireless is set (and the
+    interface is listed there), otherwise from iwconfig. Returns None if the signal level isn't available.
+    """
+
+    if (use_proc_wireless):
+        signal_level = get_proc_signal_level(interface)
+        if (signal_level is not None):
+            return signal_level
+    return get_iwconfig_signal_level(get_iwconfig_output(interface))
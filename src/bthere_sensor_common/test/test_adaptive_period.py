@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import unittest
+
+from bthere_sensor_common.adaptive_period import AdaptivePeriod, SPEED_UP_FACTOR, SLOW_DOWN_FACTOR
+
+IDLE = 0.1
+BUSY = 0.9
+
+
+class TestAdaptivePeriod(unittest.TestCase):
+
+    def make_period(self, samples, **kwargs):
+        period = AdaptivePeriod(1.0, adaptive=True, volatility_scale=1.0, **kwargs)
+        for sample in samples:
+            period.add_sample(sample)
+        return period
+
+    def test_speed_up_while_volatile(self):
+        period = self.make_period([0.0, 2.0, 0.0, 2.0])
+        self.assertAlmostEqual(period.update(IDLE), SPEED_UP_FACTOR)
+
+    def test_slow_down_while_stable(self):
+        period = self.make_period([1.0, 1.0, 1.1, 1.1])
+        self.assertAlmostEqual(period.update(IDLE), SLOW_DOWN_FACTOR)
+
+    def test_unchanged_in_between(self):
+        period = self.make_period([0.0, 0.5, 0.0, 0.5])
+        self.assertAlmostEqual(period.update(IDLE), 1.0)
+
+    def test_slow_down_without_samples(self):
+        self.assertAlmostEqual(self.make_period([]).update(IDLE), SLOW_DOWN_FACTOR)
+
+    def test_clamped_to_min_period(self):
+        period = self.make_period([0.0, 10.0, 0.0, 10.0], min_period=0.3)
+        for update in range(10):
+            period.update(IDLE)
+        self.assertAlmostEqual(period.period, 0.3)
+
+    def test_clamped_to_max_period(self):
+        period = self.make_period([1.0, 1.0], max_period=2.0)
+        for update in range(10):
+            period.update(IDLE)
+        self.assertAlmostEqual(period.period, 2.0)
+
+    def test_default_bounds(self):
+        period = self.make_period([1.0, 1.0])
+        for update in range(20):
+            period.update(IDLE)
+        self.assertAlmostEqual(period.period, 4.0)
+
+    def test_load_overrides_volatility(self):
+        period = self.make_period([0.0, 2.0, 0.0, 2.0])
+        self.assertAlmostEqual(period.update(BUSY), SLOW_DOWN_FACTOR)
+
+    def test_load_unavailable(self):
+        period = self.make_period([0.0, 2.0, 0.0, 2.0])
+        self.assertAlmostEqual(period.update(float("NaN")), SPEED_UP_FACTOR)
+
+    def test_not_adaptive(self):
+        period = AdaptivePeriod(1.0, adaptive=False)
+        for sample in [0.0, 2.0, 0.0, 2.0]:
+            period.add_sample(sample)
+        self.assertAlmostEqual(period.update(BUSY), 1.0)
+
+    def test_volatility_scaled_by_period(self):
+        period = self.make_period([0.0, 1.0, 0.0, 1.0])
+        self.assertAlmostEqual(period.get_volatility(), 1.0)
+        period.period = 0.5
+        self.assertAlmostEqual(period.get_volatility(), 0.5)
+
+    def test_noise_doesnt_hold_min_period(self):
+        # noise of volatility_scale is volatile at the initial period, but not at half of it
+        period = self.make_period([0.0, 1.0, 0.0, 1.0])
+        for update in range(10):
+            period.update(IDLE)
+        self.assertAlmostEqual(period.period, 0.5)
+
+    def test_noise_moves_period_off_min(self):
+        period = self.make_period([0.0, 0.5, 0.0, 0.5])
+        period.period = period.min_period
+        for update in range(10):
+            period.update(IDLE)
+        self.assertGreater(period.period, 0.5)
+
+    def test_trend_still_followed(self):
+        # a ramp changing by 4 per second is volatile until the change per sample is small enough
+        period = AdaptivePeriod(1.0, adaptive=True, volatility_scale=1.0)
+        for update in range(10):
+            for sample in range(5):
+                period.add_sample(4.0 * period.period * sample)
+            period.update(IDLE)
+        self.assertAlmostEqual(period.period, 0.25)
+
+    def test_nan_and_none_samples_ignored(self):
+        period = self.make_period([1.0, float("NaN"), None, 1.0])
+        self.assertEqual(len(period.samples), 2)
+        self.assertAlmostEqual(period.get_volatility(), 0.0)
+
+    def test_window(self):
+        # the early burst has left the window of 3 samples
+        period = self.make_period([0.0, 5.0, 1.0, 1.0, 1.0], window_size=3)
+        self.assertAlmostEqual(period.get_volatility(), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
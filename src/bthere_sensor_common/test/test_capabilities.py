@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from bthere_sensor_common import capabilities
+from bthere_sensor_common.capabilities import read_cache, write_cache, get_capabilities, get_cache_key, find_tool, \
+    CACHE_VERSION
+
+# Stands in for a probe result, so tests can tell a cached result from a fresh probe.
+CACHED = {"architecture": "cached", "cpu_hwmon_dir": None, "proc_net_wireless": False,
+          "tools": {"upower": None, "nmcli": None, "iwconfig": None}}
+
+
+class TestCapabilityCache(unittest.TestCase):
+    """Reads and writes the cache in a temporary directory instead of $ROS_HOME."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, "ros_home", capabilities.CACHE_FILE_NAME)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_raw_cache(self, contents):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, "w") as cache_file:
+            cache_file.write(contents)
+
+    def test_round_trip(self):
+        # the cache directory doesn't exist yet
+        write_cache(self.cache_path, "key", CACHED)
+        self.assertEqual(read_cache(self.cache_path, "key"), CACHED)
+        # no temporary file is left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.cache_path)), [capabilities.CACHE_FILE_NAME])
+
+    def test_missing_cache(self):
+        self.assertIsNone(read_cache(self.cache_path, "key"))
+
+    def test_wrong_key_ignored(self):
+        write_cache(self.cache_path, "key", CACHED)
+        self.assertIsNone(read_cache(self.cache_path, "other key"))
+
+    def test_wrong_version_ignored(self):
+        self.write_raw_cache(json.dumps({"version": CACHE_VERSION + 1, "key": "key", "capabilities": CACHED}))
+        self.assertIsNone(read_cache(self.cache_path, "key"))
+
+    def test_cached_result_used(self):
+        write_cache(self.cache_path, get_cache_key(), CACHED)
+        self.assertEqual(get_capabilities(self.cache_path), CACHED)
+
+    def test_stale_cache_probed_again(self):
+        write_cache(self.cache_path, "a previous boot", CACHED)
+        probed = get_capabilities(self.cache_path)
+        self.assertNotEqual(probed["architecture"], "cached")
+        self.assertEqual(read_cache(self.cache_path, get_cache_key()), probed)
+
+    def test_corrupt_cache_probed_again(self):
+        self.write_raw_cache('{"version": 1, "key": ')
+        probed = get_capabilities(self.cache_path)
+        self.assertEqual(sorted(probed.keys()), ["architecture", "cpu_hwmon_dir", "proc_net_wireless", "tools"])
+        self.assertEqual(read_cache(self.cache_path, get_cache_key()), probed)
+
+    def test_refresh(self):
+        write_cache(self.cache_path, get_cache_key(), CACHED)
+        probed = get_capabilities(self.cache_path, refresh=True)
+        self.assertNotEqual(probed["architecture"], "cached")
+        self.assertEqual(read_cache(self.cache_path, get_cache_key()), probed)
+
+
+class TestFindTool(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.environ.get("PATH")
+        self.directories = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        os.environ["PATH"] = os.pathsep.join(self.directories)
+
+    def tearDown(self):
+        if(self.path is None):
+            del os.environ["PATH"]
+        else:
+            os.environ["PATH"] = self.path
+        for directory in self.directories:
+            shutil.rmtree(directory)
+
+    def make_file(self, directory, name, executable):
+        path = os.path.join(directory, name)
+        open(path, "w").close()
+        if(executable):
+            os.chmod(path, stat.S_IRWXU)
+        return path
+
+    def test_found(self):
+        path = self.make_file(self.directories[1], "nmcli", True)
+        self.assertEqual(find_tool("nmcli"), path)
+
+    def test_first_on_path_wins(self):
+        path = self.make_file(self.directories[0], "nmcli", True)
+        self.make_file(self.directories[1], "nmcli", True)
+        self.assertEqual(find_tool("nmcli"), path)
+
+    def test_not_executable(self):
+        self.make_file(self.directories[0], "nmcli", False)
+        path = self.make_file(self.directories[1], "nmcli", True)
+        self.assertEqual(find_tool("nmcli"), path)
+
+    def test_directory_ignored(self):
+        os.mkdir(os.path.join(self.directories[0], "nmcli"))
+        self.assertIsNone(find_tool("nmcli"))
+
+    def test_missing(self):
+        self.assertIsNone(find_tool("nmcli"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+import struct
+import unittest
+from math import isnan, sqrt
+
+from bthere_sensor_common.fleet import FleetState, get_header_size, unpack_cpu_data, unpack_network_data, \
+    unpack_wifi_data, get_battery_percentage_offset, unpack_battery_percentage, CPU_LOAD, PACKAGE_TEMP, \
+    SIGNAL_LEVEL, BATTERY_PERCENTAGE
+
+MELODIC_BATTERY_STATE_SLOTS = ["header", "voltage", "current", "charge", "capacity", "design_capacity", "percentage",
+                               "power_supply_status", "power_supply_health", "power_supply_technology", "present",
+                               "cell_voltage", "location", "serial_number"]
+NOETIC_BATTERY_STATE_SLOTS = ["header", "voltage", "temperature", "current", "charge", "capacity", "design_capacity",
+                              "percentage", "power_supply_status", "power_supply_health", "power_supply_technology",
+                              "present", "cell_voltage", "cell_temperature", "location", "serial_number"]
+
+
+def pack_header(frame_id=b"base_link"):
+    """Packs a std_msgs/Header: uint32 seq, time stamp (uint32 secs, uint32 nsecs), string frame_id."""
+
+    return struct.pack("<IIII", 7, 1600000000, 500, len(frame_id)) + frame_id
+
+
+def pack_float32_array(values):
+    return struct.pack("<I%df" % len(values), len(values), *values)
+
+
+def pack_battery_state(slots, percentage):
+    """Packs a BatteryState with the given field order, up to the end of its float32 fields."""
+
+    floats = slots[slots.index("voltage"):slots.index("percentage") + 1]
+    values = [100.0 + i for i in range(len(floats) - 1)] + [percentage]
+    return pack_header() + struct.pack("<%df" % len(values), *values) + struct.pack("<BBBB", 2, 1, 2, 1)
+
+
+class TestUnpack(unittest.TestCase):
+    """Unpacks buffers packed with the layouts in the .msg files, as rospy.AnyMsg would receive them."""
+
+    def test_header_size(self):
+        self.assertEqual(get_header_size(pack_header(b"")), 16)
+        self.assertEqual(get_header_size(pack_header(b"base_link")), 25)
+
+    def test_cpu_data(self):
+        buff = pack_header() + struct.pack("<f", 0.5) + pack_float32_array([0.25, 0.5, 0.75]) + \
+            struct.pack("<f", 61.5) + pack_float32_array([60.0, 63.0, 61.0])
+        self.assertEqual(unpack_cpu_data(buff), (0.5, 61.5))
+
+    def test_cpu_data_without_cores(self):
+        buff = pack_header(b"") + struct.pack("<f", 0.0) + pack_float32_array([]) + struct.pack("<f", float("NaN")) + \
+            pack_float32_array([float("NaN")])
+        overall_cpu_load, package_temp = unpack_cpu_data(buff)
+        self.assertEqual(overall_cpu_load, 0.0)
+        self.assertTrue(isnan(package_temp))
+
+    def test_network_data(self):
+        buff = pack_header() + struct.pack("<fiiifiii", 120.5, 1000, 2, 3, 30.25, 500, 4, 5)
+        self.assertEqual(unpack_network_data(buff), (120.5, 30.25))
+
+    def test_wifi_data(self):
+        self.assertEqual(unpack_wifi_data(pack_header() + struct.pack("<i", -57)), -57)
+
+    def test_battery_percentage_melodic(self):
+        offset = get_battery_percentage_offset(MELODIC_BATTERY_STATE_SLOTS)
+        self.assertEqual(offset, 20)
+        buff = pack_battery_state(MELODIC_BATTERY_STATE_SLOTS, 87.5)
+        self.assertEqual(unpack_battery_percentage(buff, offset), 87.5)
+
+    def test_battery_percentage_noetic(self):
+        offset = get_battery_percentage_offset(NOETIC_BATTERY_STATE_SLOTS)
+        self.assertEqual(offset, 24)
+        buff = pack_battery_state(NOETIC_BATTERY_STATE_SLOTS, 87.5)
+        self.assertEqual(unpack_battery_percentage(buff, offset), 87.5)
+
+
+class TestFleetState(unittest.TestCase):
+
+    def test_rolling_statistics(self):
+        state = FleetState(0.5)
+        slot = state.add_robot("/a")
+        self.assertTrue(isnan(state.means[CPU_LOAD][slot]))
+        for value in [10.0, 20.0, 20.0]:
+            state.update(slot, CPU_LOAD, value, 0.0)
+        # mean 10, 15, 17.5; variance 0, 0.5 * (0 + 10 * 5) = 25, 0.5 * (25 + 5 * 2.5) = 18.75
+        self.assertAlmostEqual(state.means[CPU_LOAD][slot], 17.5)
+        self.assertAlmostEqual(state.variances[CPU_LOAD][slot], 18.75)
+        self.assertEqual(state.latest[CPU_LOAD][slot], 20.0)
+
+    def test_nan_ignored(self):
+        state = FleetState(0.5)
+        slot = state.add_robot("/a")
+        state.update(slot, PACKAGE_TEMP, 50.0, 1.0)
+        state.update(slot, PACKAGE_TEMP, float("NaN"), 2.0)
+        self.assertEqual(state.means[PACKAGE_TEMP][slot], 50.0)
+        self.assertEqual(state.latest[PACKAGE_TEMP][slot], 50.0)
+        self.assertEqual(state.last_seen[PACKAGE_TEMP][slot], 1.0)
+
+    def test_add_robot_once(self):
+        state = FleetState(0.5)
+        self.assertEqual(state.add_robot("/a"), 0)
+        self.assertEqual(state.add_robot("/b"), 1)
+        self.assertEqual(state.add_robot("/a"), 0)
+        self.assertEqual(state.robots, ["/a", "/b"])
+
+    def test_freshness_per_metric(self):
+        state = FleetState(0.5)
+        a = state.add_robot("/a")
+        b = state.add_robot("/b")
+        state.add_robot("/never_reported")
+        # a's battery monitor stopped long ago, but its CPU monitor is still publishing
+        state.update(a, BATTERY_PERCENTAGE, 5.0, 0.0)
+        state.update(a, CPU_LOAD, 0.5, 95.0)
+        state.update(b, BATTERY_PERCENTAGE, 50.0, 95.0)
+        state.update(b, CPU_LOAD, 0.25, 95.0)
+        self.assertEqual(state.get_fresh_slots(BATTERY_PERCENTAGE, 100.0, 60.0), [b])
+        self.assertEqual(state.get_fresh_slots(CPU_LOAD, 100.0, 60.0), [a, b])
+        self.assertEqual(state.get_reporting_count(100.0, 60.0), 2)
+        self.assertAlmostEqual(state.get_mean(BATTERY_PERCENTAGE, 100.0, 60.0), 50.0)
+        self.assertAlmostEqual(state.get_mean(CPU_LOAD, 100.0, 60.0), 0.375)
+        self.assertAlmostEqual(state.get_total(CPU_LOAD, 100.0, 60.0), 0.75)
+        self.assertEqual(state.get_worst(BATTERY_PERCENTAGE, 100.0, 60.0, 5, False)[0], ["/b"])
+
+    def test_all_stale(self):
+        state = FleetState(0.5)
+        slot = state.add_robot("/a")
+        state.update(slot, SIGNAL_LEVEL, -60.0, 0.0)
+        self.assertEqual(state.get_reporting_count(100.0, 60.0), 0)
+        self.assertTrue(isnan(state.get_mean(SIGNAL_LEVEL, 100.0, 60.0)))
+        self.assertEqual(state.get_total(SIGNAL_LEVEL, 100.0, 60.0), 0)
+        self.assertEqual(state.get_worst(SIGNAL_LEVEL, 100.0, 60.0, 5, False), ([], [], [], []))
+
+    def make_fleet(self, metric, values):
+        state = FleetState(0.5)
+        for index, value in enumerate(values):
+            slot = state.add_robot("/robot_%d" % index)
+            state.update(slot, metric, value, 0.0)
+        return state
+
+    def test_worst_highest(self):
+        state = self.make_fleet(PACKAGE_TEMP, [50.0, 80.0, 40.0, 70.0, 60.0])
+        robots, means, stddevs, latest = state.get_worst(PACKAGE_TEMP, 1.0, 60.0, 3, True)
+        self.assertEqual(robots, ["/robot_1", "/robot_3", "/robot_4"])
+        self.assertEqual(means, [80.0, 70.0, 60.0])
+        self.assertEqual(stddevs, [0.0, 0.0, 0.0])
+        self.assertEqual(latest, [80.0, 70.0, 60.0])
+
+    def test_worst_lowest(self):
+        state = self.make_fleet(BATTERY_PERCENTAGE, [50.0, 80.0, 40.0, 70.0, 60.0])
+        robots, means, stddevs, latest = state.get_worst(BATTERY_PERCENTAGE, 1.0, 60.0, 2, False)
+        self.assertEqual(robots, ["/robot_2", "/robot_0"])
+        self.assertEqual(means, [40.0, 50.0])
+
+    def test_worst_ranked_on_rolling_mean(self):
+        state = self.make_fleet(PACKAGE_TEMP, [70.0, 60.0])
+        # a single spike on robot 1 raises its mean to 70.5, and it becomes the hottest
+        state.update(1, PACKAGE_TEMP, 81.0, 0.0)
+        robots, means, stddevs, latest = state.get_worst(PACKAGE_TEMP, 1.0, 60.0, 2, True)
+        self.assertEqual(robots, ["/robot_1", "/robot_0"])
+        self.assertEqual(means, [70.5, 70.0])
+        self.assertAlmostEqual(stddevs[0], sqrt(0.5 * 21.0 * 10.5))
+        self.assertEqual(latest, [81.0, 70.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
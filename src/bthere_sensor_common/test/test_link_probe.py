@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+import unittest
+from math import isnan
+
+from bthere_sensor_common.link_probe import ProbeWindow
+
+
+class TestProbeWindow(unittest.TestCase):
+
+    def make_window(self, rtts, timeout=1.0):
+        """Makes a window with one probe per second, answered after the given rtts (None for unanswered)."""
+
+        window = ProbeWindow(100.0, timeout)
+        for sequence, rtt in enumerate(rtts):
+            window.sent(sequence, float(sequence))
+            if(rtt is not None):
+                window.received(sequence, sequence + rtt)
+        return window
+
+    def test_loss(self):
+        window = self.make_window([0.1, None, 0.1, None])
+        stats = window.get_stats(10.0)
+        self.assertEqual(stats["SENT"], 4)
+        self.assertEqual(stats["RECEIVED"], 2)
+        self.assertAlmostEqual(stats["LOSS"], 0.5)
+
+    def test_nearest_rank_percentiles(self):
+        # 0.01 to 0.20 s, sent out of order
+        rtts = [0.01 * i for i in [7, 3, 20, 1, 15, 9, 12, 4, 18, 2, 11, 6, 16, 14, 5, 19, 8, 13, 10, 17]]
+        stats = self.make_window(rtts).get_stats(100.0)
+        self.assertAlmostEqual(stats[50], 0.10)
+        self.assertAlmostEqual(stats[90], 0.18)
+        self.assertAlmostEqual(stats[99], 0.20)
+        self.assertAlmostEqual(stats["MIN"], 0.01)
+        self.assertAlmostEqual(stats["MAX"], 0.20)
+        self.assertAlmostEqual(stats["MEAN"], 0.105)
+
+    def test_jitter(self):
+        stats = self.make_window([0.1, 0.3, 0.2]).get_stats(10.0)
+        self.assertAlmostEqual(stats["JITTER"], 0.15)
+
+    def test_probes_within_timeout_not_counted(self):
+        window = self.make_window([0.1, None, None], timeout=1.0)
+        # probe 1 was sent 1.5 s ago and counts as lost, probe 2 was sent 0.5 s ago and may still be answered
+        stats = window.get_stats(2.5)
+        self.assertEqual(stats["SENT"], 2)
+        self.assertEqual(stats["RECEIVED"], 1)
+        self.assertAlmostEqual(stats["LOSS"], 0.5)
+
+    def test_late_replies_ignored(self):
+        window = self.make_window([0.1, 1.5], timeout=1.0)
+        stats = window.get_stats(10.0)
+        self.assertEqual(stats["SENT"], 2)
+        self.assertEqual(stats["RECEIVED"], 1)
+
+    def test_negative_rtt_ignored(self):
+        window = self.make_window([0.1, -0.5])
+        self.assertEqual(window.get_stats(10.0)["RECEIVED"], 1)
+
+    def test_duplicate_reply_ignored(self):
+        window = self.make_window([0.1])
+        window.received(0, 0.9)
+        self.assertAlmostEqual(window.get_stats(10.0)["MAX"], 0.1)
+
+    def test_trim(self):
+        window = ProbeWindow(5.0, 1.0)
+        for sequence in range(10):
+            window.sent(sequence, float(sequence))
+        window.trim(10.0)
+        # probes sent at 5 to 9 s are within 5 s of 10 s
+        self.assertEqual(len(window.probes), 5)
+        self.assertEqual(len(window.pending), 5)
+
+    def test_no_replies(self):
+        stats = self.make_window([None, None]).get_stats(10.0)
+        self.assertAlmostEqual(stats["LOSS"], 1.0)
+        self.assertTrue(isnan(stats[50]))
+        self.assertTrue(isnan(stats["JITTER"]))
+
+    def test_nothing_sent(self):
+        stats = ProbeWindow(10.0, 1.0).get_stats(0.0)
+        self.assertEqual(stats["SENT"], 0)
+        self.assertTrue(isnan(stats["LOSS"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from math import isnan
+
+from bthere_sensor_common import shm_channel
+from bthere_sensor_common.shm_channel import SampleWriter, SampleReader, CPU_LAYOUT, BATTERY_LAYOUT, \
+    SEQUENCE_FORMAT, SEQUENCE_OFFSET
+
+
+class TestShmChannel(unittest.TestCase):
+    """Writes and reads segments in a temporary directory instead of /dev/shm."""
+
+    def setUp(self):
+        self.shm_dir = shm_channel.SHM_DIR
+        self.directory = tempfile.mkdtemp()
+        shm_channel.SHM_DIR = self.directory
+
+    def tearDown(self):
+        shm_channel.SHM_DIR = self.shm_dir
+        shutil.rmtree(self.directory)
+
+    def test_cpu_round_trip(self):
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        reader = SampleReader("cpu", CPU_LAYOUT)
+        self.assertIsNone(reader.read())
+        writer.write(100.5, 0.25, 45.0, [0.5, 0.0], [44.0, 46.0])
+        sample = reader.read()
+        self.assertEqual(sample.sequence, 2)
+        self.assertEqual(reader.get_sequence(), 2)
+        self.assertEqual(sample.stamp, 100.5)
+        self.assertEqual(sample.overall_cpu_load, 0.25)
+        self.assertEqual(sample.package_temp, 45.0)
+        self.assertEqual(list(sample.core_loads), [0.5, 0.0])
+        self.assertEqual(list(sample.core_temps), [44.0, 46.0])
+        # no core temperatures on this machine
+        writer.write(101.5, float("NaN"), float("NaN"), [0.5, 0.5], [])
+        sample = reader.read()
+        self.assertEqual(sample.sequence, 4)
+        self.assertTrue(isnan(sample.overall_cpu_load))
+        self.assertEqual(list(sample.core_temps), [])
+        reader.close()
+        writer.close()
+
+    def test_battery_round_trip(self):
+        writer = SampleWriter("battery", BATTERY_LAYOUT)
+        reader = SampleReader("battery", BATTERY_LAYOUT)
+        writer.write(100.5, 12.5, -1.25, 40.0, 50.0, 60.0, 80.0, 2, 1, 2, True)
+        sample = reader.read()
+        self.assertEqual(sample.sequence, 2)
+        self.assertEqual(sample[1:], (100.5, 12.5, -1.25, 40.0, 50.0, 60.0, 80.0, 2, 1, 2, True))
+        reader.close()
+        writer.close()
+
+    def test_odd_sequence(self):
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        reader = SampleReader("cpu", CPU_LAYOUT)
+        writer.write(100.5, 0.25, 45.0, [0.5], [44.0])
+        # as if the writer were in the middle of the next sample
+        struct.pack_into(SEQUENCE_FORMAT, writer.buffer, SEQUENCE_OFFSET, 3)
+        self.assertIsNone(reader.read(retries=5))
+        struct.pack_into(SEQUENCE_FORMAT, writer.buffer, SEQUENCE_OFFSET, 4)
+        self.assertEqual(reader.read().sequence, 4)
+        reader.close()
+        writer.close()
+
+    def test_layout_mismatch(self):
+        SampleWriter("cpu", CPU_LAYOUT).close()
+        self.assertRaises(ValueError, SampleReader, "cpu", BATTERY_LAYOUT)
+
+    def test_kind_mismatch(self):
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        # same size, different layout kind
+        struct.pack_into("<H", writer.buffer, 6, BATTERY_LAYOUT.kind)
+        self.assertRaises(ValueError, SampleReader, "cpu", CPU_LAYOUT)
+        writer.close()
+
+    def test_missing_segment(self):
+        self.assertRaises((IOError, OSError), SampleReader, "cpu", CPU_LAYOUT)
+
+    def test_restarted_writer_continues_sequence(self):
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        writer.write(100.5, 0.25, 45.0, [0.5], [44.0])
+        writer.write(101.5, 0.25, 45.0, [0.5], [44.0])
+        writer.close()
+        reader = SampleReader("cpu", CPU_LAYOUT)
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        self.assertEqual(reader.read().sequence, 4)
+        writer.write(102.5, 0.5, 46.0, [0.5], [44.0])
+        self.assertEqual(reader.read().sequence, 6)
+        # a writer that died in the middle of a sample left an odd sequence number
+        struct.pack_into(SEQUENCE_FORMAT, writer.buffer, SEQUENCE_OFFSET, 7)
+        writer.close()
+        writer = SampleWriter("cpu", CPU_LAYOUT)
+        self.assertEqual(reader.read().sequence, 8)
+        writer.write(103.5, 0.5, 46.0, [0.5], [44.0])
+        self.assertEqual(reader.read().sequence, 10)
+        reader.close()
+        writer.close()
+
+    def test_writer_replaces_other_layout(self):
+        SampleWriter("segment", BATTERY_LAYOUT).close()
+        writer = SampleWriter("segment", CPU_LAYOUT)
+        reader = SampleReader("segment", CPU_LAYOUT)
+        self.assertIsNone(reader.read())
+        reader.close()
+        writer.close()
+
+    def test_symlink_not_followed(self):
+        target = os.path.join(self.directory, "target")
+        with open(target, "w") as target_file:
+            target_file.write("not a segment")
+        os.symlink(target, os.path.join(self.directory, "cpu"))
+        self.assertRaises(OSError, SampleWriter, "cpu", CPU_LAYOUT)
+        with open(target) as target_file:
+            self.assertEqual(target_file.read(), "not a segment")
+
+    def test_invalid_name(self):
+        self.assertRaises(ValueError, SampleWriter, "../cpu", CPU_LAYOUT)
+        self.assertRaises(ValueError, SampleWriter, "", CPU_LAYOUT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
-from rospy import init_node, loginfo, logerr, get_param, Publisher, Rate, is_shutdown, ROSInterruptException, Time
-import os
+from rospy import init_node, loginfo, logerr, logwarn, get_param, Publisher, is_shutdown, ROSInterruptException, Time
 from std_msgs.msg import Header
 from bthere_sensor_msgs.msg import WifiData
+from bthere_sensor_common.adaptive_rate import get_adaptive_rate
+from bthere_sensor_common.capabilities import get_capabilities, log_startup_time
+from bthere_sensor_common.wifi import get_connected_interface, get_signal_level
 import sys
 
 test_wifi_values = [-90, -80, -72, -60, -46]
@@ -21,32 +23,23 @@ def publish(pub, signal_level, quiet):
     pub.publish(toPublish)
 
 
-def output_wifi(rate, pub, quiet):
-    # Get power using iwconfig
+def output_wifi(rate, pub, quiet, use_proc_wireless):
+    # Get power from /proc/net/wireless if the capability probe found it, otherwise using iwconfig.
+    # Returns the signal level that was published, or None if there wasn't one.
 
     # Get the active network connection
-    cmd_output = os.popen('nmcli dev status').read()
-    lines = cmd_output.splitlines()
-    has_found_wifi = False
-    for line in lines:
-        if (line.find('wifi') != -1) and (line.find('connected') != -1):
-            has_found_wifi = True
-            interface = line.split()[0]
-    # Without this check, the script will crash on the next line (cmd_output = ...) if there isn't a wifi device without
+    interface = get_connected_interface()
+    # Without this check, the script will crash when getting the signal level if there isn't a wifi device without
     # a clear error message.
-    if(not has_found_wifi):
+    if(interface is None):
         logerr("No wifi device found.")
-        return
+        return None
 
     # Get the signal level
-    cmd_output = os.popen('iwconfig ' + interface).read()
-    lines = cmd_output.splitlines()
-    for line in lines:
-        if (line.find('Signal level') != -1):
-            index = line.find('Signal level')
-            signal_level = line[index:].split('=')[1].split()[0]
-
-            publish(pub, signal_level, quiet)
+    signal_level = get_signal_level(interface, use_proc_wireless)
+    if (signal_level is not None):
+        publish(pub, signal_level, quiet)
+    return signal_level
 
 
 def output_test_data(rate, pub, quiet):
@@ -55,6 +48,7 @@ def output_test_data(rate, pub, quiet):
     wifi_value = test_wifi_values[wifi_test_data_index]
     publish(pub, wifi_value, quiet)
     wifi_test_data_index = (wifi_test_data_index+1) % len(test_wifi_values)
+    return wifi_value
 
 
 def wifi_signal_monitor():
@@ -62,17 +56,29 @@ def wifi_signal_monitor():
     pub = Publisher('/bthere/wifi_signal', WifiData, queue_size=10)
     loginfo('Outputting to /bthere/wifi_signal')
     test_output = get_param('~test_output', False)
-    update_period = get_param('~update_period', 15.0)
     quiet = get_param('~quiet', False)
 
-    rate = Rate(1/float(update_period))
-    loginfo('Publishing rate: ' + str(1/float(update_period)) + 'hz')
+    # With ~adaptive set, the period speeds up while the signal level changes by 3 dBm or more between updates
+    rate = get_adaptive_rate(15.0, 3.0, '/bthere/wifi_signal/update_period')
+    loginfo('Publishing rate: ' + str(1/rate.period) + 'hz')
+
+    capabilities = get_capabilities()
+    can_sample = capabilities['tools']['nmcli'] is not None and (
+        capabilities['proc_net_wireless'] or capabilities['tools']['iwconfig'] is not None)
+    if (not test_output and not can_sample):
+        logerr('nmcli and either iwconfig or /proc/net/wireless are required, no wifi data will be published.')
 
+    has_published = False
     while not is_shutdown():
+        signal_level = None
         if (test_output):
-            output_test_data(rate, pub, quiet)
-        else:
-            output_wifi(rate, pub, quiet)
+            signal_level = output_test_data(rate, pub, quiet)
+        elif (can_sample):
+            signal_level = output_wifi(rate, pub, quiet, capabilities['proc_net_wireless'])
+        rate.add_sample(signal_level)
+        if (signal_level is not None and not has_published):
+            log_startup_time(loginfo, logwarn)
+            has_published = True
         rate.sleep()
 
 
@@ -86,6 +92,10 @@ def print_help():
     print(
         "   _test_output:={true|false}   output cyclic test data instead of real data. Default is false")
     print("   _update_period:=DOUBLE       seconds between updates. Default is 15.0")
+    print("   _adaptive:={true|false}      adapt the update period to how volatile the data is. Default is false")
+    print("   _min_period:=DOUBLE          shortest adaptive update period. Default is update_period / 4")
+    print("   _max_period:=DOUBLE          longest adaptive update period. Default is update_period * 4")
+    print("   _volatility_scale:=DOUBLE    change between updates that counts as volatile. Default is 3.0 (dBm)")
 
 
 def check_for_help_request(argv):